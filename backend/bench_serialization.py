@@ -0,0 +1,66 @@
+import json
+import time
+import uuid
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+
+from responses import MongoJSONResponse
+
+
+def serialize_mongo(data):
+    # Previous response path, kept here for comparison
+    if isinstance(data, list):
+        return [serialize_mongo(item) for item in data]
+    if isinstance(data, dict):
+        new_data = {}
+        for key, value in data.items():
+            if isinstance(value, ObjectId):
+                new_data[key] = str(value)
+            else:
+                new_data[key] = serialize_mongo(value)
+        return new_data
+    return data
+
+
+def make_users(n):
+    return [
+        {
+            "_id": ObjectId(),
+            "id": str(uuid.uuid4()),
+            "email": f"user{i}@wingo.com",
+            "name": f"User {i}",
+            "balance": i * 1.5,
+            "vip_tier": 1 + i % 4,
+            "role": "user",
+            "created_at": datetime.now(timezone.utc),
+        }
+        for i in range(n)
+    ]
+
+
+def legacy(users):
+    return json.dumps(jsonable_encoder(serialize_mongo(users))).encode()
+
+
+def fast(users):
+    return MongoJSONResponse(users).body
+
+
+def bench(fn, users, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn(users)
+    return (time.perf_counter() - started) / repeat
+
+
+if __name__ == "__main__":
+    for size, repeat in [(100, 200), (10_000, 5), (100_000, 1)]:
+        users = make_users(size)
+        old = bench(legacy, users, repeat)
+        new = bench(fast, users, repeat)
+        print(
+            f"{size:>7} users  serialize_mongo+jsonable_encoder: {old * 1000:9.2f} ms  "
+            f"MongoJSONResponse: {new * 1000:8.2f} ms  ({old / new:5.1f}x)"
+        )
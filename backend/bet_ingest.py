@@ -0,0 +1,204 @@
+import asyncio
+import logging
+import time
+
+from pymongo import UpdateOne
+
+import stats
+
+logger = logging.getLogger(__name__)
+
+FLUSH_MAX_BETS = 500
+FLUSH_MAX_DELAY = 0.05
+VERIFY_ATTEMPTS = 3
+VERIFY_BACKOFF = 0.2
+
+
+class PeriodClosed(Exception):
+    pass
+
+
+class BetIngestor:
+    # Group commit for bet records. Debits are applied per request with a
+    # conditional $inc; the bet documents are queued and written together
+    # with insert_many, and every request waits for its batch to land.
+
+    def __init__(self, db, max_bets=FLUSH_MAX_BETS, max_delay=FLUSH_MAX_DELAY):
+        self.db = db
+        self.max_bets = max_bets
+        self.max_delay = max_delay
+        self._pending = []
+        self._wakeup = None
+        self._task = None
+        self.flushes = 0
+        self.flushed_bets = 0
+
+    def start(self):
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def debit(self, user_id, amount):
+        user = await self.db.users.find_one_and_update(
+            {"id": user_id, "balance": {"$gte": amount}},
+            {"$inc": {"balance": -amount}},
+            projection={"_id": 0, "balance": 1}
+        )
+        return user is not None
+
+    async def submit(self, bet):
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((bet, future))
+
+        if len(self._pending) >= self.max_bets:
+            self._wakeup.set()
+
+        return await future
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.max_delay)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            if self._pending:
+                try:
+                    await self.flush()
+                except Exception:
+                    logger.exception("Bet flush failed")
+
+    async def flush(self):
+        batch, self._pending = self._pending[:self.max_bets], self._pending[self.max_bets:]
+        if not batch:
+            return
+
+        started = time.perf_counter()
+
+        try:
+            batch = await self._drop_closed(batch)
+        except Exception as exc:
+            # Nothing was written; the debits are left for reconciliation as
+            # for an unverified insert
+            logger.error("Bet flush could not check periods, %d bets unresolved", len(batch))
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            raise
+        if not batch:
+            return
+        bets = [bet for bet, _ in batch]
+
+        try:
+            failed = await self._insert(bets)
+        except Exception as exc:
+            # Outcome unknown: leave the debits in place for reconciliation
+            # rather than refunding bets that may have been written
+            logger.error(
+                "Bet flush could not be verified, %d bets unresolved: %s",
+                len(bets), [bet["id"] for bet in bets]
+            )
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            raise
+
+        try:
+            await stats.inc_active_balance(self.db, -sum(
+                bet["amount"] for i, bet in enumerate(bets) if i not in failed
+            ))
+        except Exception:
+            logger.exception("Failed to update active balance after bet flush")
+
+        for i, (bet, future) in enumerate(batch):
+            if future.done():
+                continue
+            if i in failed:
+                future.set_exception(failed[i])
+            else:
+                future.set_result(bet)
+
+        self.flushes += 1
+        self.flushed_bets += len(bets)
+        logger.debug("Flushed %d bets in %.3fs", len(bets), time.perf_counter() - started)
+
+    async def _drop_closed(self, batch):
+        # A bet queued just before the cutoff can reach the flush after its
+        # period was revealed, when settlement may already have read the
+        # pending bets; refund it instead of writing a bet nothing settles
+        keys = {(bet["game_type"], bet["period_id"]) for bet, _ in batch}
+        cursor = self.db.wingo_periods.find(
+            {"$or": [{"game_type": g, "period_id": p} for g, p in keys], "revealed": True},
+            projection={"_id": 0, "game_type": 1, "period_id": 1}
+        )
+        revealed = {(doc["game_type"], doc["period_id"]) async for doc in cursor}
+        if not revealed:
+            return batch
+
+        open_bets, closed = [], []
+        for bet, future in batch:
+            key = (bet["game_type"], bet["period_id"])
+            (closed if key in revealed else open_bets).append((bet, future))
+
+        logger.warning("Bet flush: %d bets reached revealed periods, refunding", len(closed))
+        await self._refund([bet for bet, _ in closed])
+        for bet, future in closed:
+            if not future.done():
+                future.set_exception(
+                    PeriodClosed(f'{bet["game_type"]} {bet["period_id"]} already revealed')
+                )
+        return open_bets
+
+    async def _insert(self, bets):
+        try:
+            await self.db.bets.insert_many(bets, ordered=False)
+            return {}
+        except Exception as exc:
+            error = exc
+
+        # insert_many can fail after writing part of the batch (timeouts,
+        # dropped connections); bet ids are unique, so refund only the
+        # bets that are not in the collection
+        landed = await self._landed([bet["id"] for bet in bets])
+        failed = {i: error for i, bet in enumerate(bets) if bet["id"] not in landed}
+
+        if failed:
+            logger.error("Bet flush: %d of %d bets failed, refunding", len(failed), len(bets))
+            await self._refund([bets[i] for i in failed])
+        return failed
+
+    async def _landed(self, ids):
+        for attempt in range(VERIFY_ATTEMPTS):
+            try:
+                cursor = self.db.bets.find({"id": {"$in": ids}}, projection={"_id": 0, "id": 1})
+                return {doc["id"] async for doc in cursor}
+            except Exception:
+                if attempt == VERIFY_ATTEMPTS - 1:
+                    raise
+                await asyncio.sleep(VERIFY_BACKOFF * (attempt + 1))
+
+    async def _refund(self, bets):
+        totals = {}
+        for bet in bets:
+            totals[bet["user_id"]] = totals.get(bet["user_id"], 0) + bet["amount"]
+
+        await self.db.users.bulk_write([
+            UpdateOne({"id": uid}, {"$inc": {"balance": amount}})
+            for uid, amount in totals.items()
+        ], ordered=False)
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+        while self._pending:
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Bet flush failed during shutdown")
+
+    def stats(self):
+        return {
+            "queued": len(self._pending),
+            "flushes": self.flushes,
+            "flushed_bets": self.flushed_bets,
+        }
@@ -0,0 +1,161 @@
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+# -------------------------------
+# INDEX DECLARATIONS
+# -------------------------------
+
+INDEXES = {
+    "wingo_periods": [
+        IndexModel(
+            [("game_type", ASCENDING), ("revealed", ASCENDING), ("start_time", ASCENDING)],
+            name="game_type_revealed_start_time"
+        ),
+        IndexModel(
+            [("game_type", ASCENDING), ("revealed", ASCENDING), ("end_time", ASCENDING)],
+            name="game_type_revealed_end_time"
+        ),
+        IndexModel(
+            [("game_type", ASCENDING), ("start_time", DESCENDING)],
+            name="game_type_start_time"
+        ),
+        IndexModel(
+            [("game_type", ASCENDING), ("period_id", ASCENDING)],
+            name="game_type_period_id", unique=True
+        ),
+        IndexModel(
+            [("game_type", ASCENDING), ("end_time", ASCENDING)],
+            name="unsettled_game_type_end_time",
+            partialFilterExpression={"settled": False}
+        ),
+    ],
+    "wingo_overrides": [
+        IndexModel(
+            [("game_type", ASCENDING), ("period_id", ASCENDING)],
+            name="game_type_period_id", unique=True
+        ),
+    ],
+    "bets": [
+        IndexModel(
+            [("period_id", ASCENDING), ("game_type", ASCENDING), ("status", ASCENDING)],
+            name="period_id_game_type_status"
+        ),
+        IndexModel([("id", ASCENDING)], name="id", unique=True),
+        IndexModel(
+            [("commission", ASCENDING)], name="commission_pending",
+            partialFilterExpression={"commission": "pending"}
+        ),
+    ],
+    "users": [
+        IndexModel([("id", ASCENDING)], name="id", unique=True),
+        IndexModel([("email", ASCENDING)], name="email", unique=True),
+        IndexModel([("role", ASCENDING)], name="role"),
+        IndexModel(
+            [("role", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            name="role_created_at_id"
+        ),
+        IndexModel(
+            [("role", ASCENDING), ("balance", DESCENDING), ("id", DESCENDING)],
+            name="role_balance_id"
+        ),
+        IndexModel([("role", ASCENDING), ("email", ASCENDING)], name="role_email"),
+    ],
+    "referral_ledger": [
+        IndexModel([("payout_id", ASCENDING), ("referrer_id", ASCENDING)], name="payout_id_referrer_id"),
+        IndexModel([("bet_id", ASCENDING), ("level", ASCENDING)], name="bet_id_level", unique=True),
+    ],
+    "mines_games": [
+        IndexModel([("game_id", ASCENDING)], name="game_id", unique=True),
+        IndexModel(
+            [("game_id", ASCENDING), ("user_id", ASCENDING), ("status", ASCENDING)],
+            name="game_id_user_id_status"
+        ),
+    ],
+}
+
+# -------------------------------
+# HOT QUERIES (for explain audit)
+# -------------------------------
+
+HOT_QUERIES = [
+    ("wingo_periods", {"game_type": "30s", "revealed": False}, [("start_time", 1)]),
+    ("wingo_periods", {"game_type": "30s"}, [("start_time", -1)]),
+    ("bets", {"period_id": "", "game_type": "30s", "status": "pending"}, None),
+    ("bets", {"commission": "pending"}, None),
+    ("users", {"id": ""}, None),
+    ("users", {"email": ""}, None),
+    ("users", {"role": "user"}, None),
+    ("mines_games", {"game_id": "", "user_id": "", "status": "active"}, None),
+]
+
+
+async def ensure_indexes(db):
+    created = {}
+    for collection, models in INDEXES.items():
+        created[collection] = await db[collection].create_indexes(models)
+    return created
+
+
+def _plan_stages(plan):
+    stages = [plan.get("stage")]
+    if "inputStage" in plan:
+        stages += _plan_stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        stages += _plan_stages(child)
+    return stages
+
+
+async def audit_indexes(db):
+    report = []
+    for collection, query, sort in HOT_QUERIES:
+        cursor = db[collection].find(query).limit(1)
+        if sort:
+            cursor = cursor.sort(sort)
+
+        explain = await cursor.explain()
+        winning = explain.get("queryPlanner", {}).get("winningPlan", {})
+        stages = _plan_stages(winning)
+
+        report.append({
+            "collection": collection,
+            "query": query,
+            "sort": sort,
+            "stages": stages,
+            "collscan": "COLLSCAN" in stages,
+        })
+    return report
+
+# -------------------------------
+# CLI
+# -------------------------------
+
+async def main(command):
+    load_dotenv(Path(__file__).parent / ".env")
+    client = AsyncIOMotorClient(os.environ["MONGO_URL"])
+    db = client[os.environ["DB_NAME"]]
+
+    try:
+        if command == "ensure":
+            print(json.dumps(await ensure_indexes(db), indent=2))
+            return 0
+
+        report = await audit_indexes(db)
+        print(json.dumps(report, indent=2, default=str))
+        return 1 if any(r["collscan"] for r in report) else 0
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "audit"
+    if command not in ("ensure", "audit"):
+        print("usage: python db_indexes.py [ensure|audit]")
+        sys.exit(2)
+    sys.exit(asyncio.run(main(command)))
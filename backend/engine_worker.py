@@ -0,0 +1,129 @@
+import argparse
+import asyncio
+import logging
+import os
+import signal
+from pathlib import Path
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from db_indexes import ensure_indexes
+from leader import LeaderLease
+from period_archive import PeriodArchive
+from wingo_engine import GAME_DURATIONS, SCHEDULE_STORED, WingoEngine
+import metrics
+import stats
+import vip
+
+logger = logging.getLogger(__name__)
+
+SHUTDOWN_GRACE = 30
+
+
+class EngineRunner:
+    # Starts and stops the leader-only engine work. Shared by the API
+    # process (ENGINE_MODE=embedded) and the standalone worker below.
+
+    def __init__(self, db, engine, archive):
+        self.db = db
+        self.engine = engine
+        self.archive = archive
+        self.tasks = {}
+
+    def follow(self):
+        self.tasks["follower"] = asyncio.create_task(self.engine.follow())
+
+    async def start(self):
+        follower = self.tasks.pop("follower", None)
+        if follower:
+            follower.cancel()
+
+        if self.engine.schedule == SCHEDULE_STORED:
+            for game in GAME_DURATIONS:
+                existing = await self.db.wingo_periods.find_one({"game_type": game})
+                if not existing:
+                    await self.engine.generate_future_periods(game, 300)
+
+        self.tasks.update({
+            "scheduler": asyncio.create_task(self.engine.run_scheduler()),
+            "settlement_sweep": asyncio.create_task(self.engine.run_settlement_sweep()),
+            "daily_rollup": asyncio.create_task(stats.run_daily_rollup(self.db)),
+            "archive": asyncio.create_task(self.archive.run()),
+            "referrals": asyncio.create_task(self.engine.referrals.run()),
+            "referral_accruals": asyncio.create_task(self.engine.referrals.run_accruals()),
+            "vip": asyncio.create_task(vip.run_reconciliation(self.db)),
+        })
+
+    def alive(self):
+        leader_tasks = [t for name, t in self.tasks.items() if name != "follower"]
+        return bool(leader_tasks) and not any(t.done() for t in leader_tasks)
+
+    async def stop(self):
+        for task in self.tasks.values():
+            task.cancel()
+        self.tasks.clear()
+
+    async def demote(self):
+        await self.stop()
+        self.follow()
+
+# -------------------------------
+# STANDALONE WORKER
+# -------------------------------
+
+async def run_worker(schedule, seed, metrics_host="0.0.0.0", metrics_port=None):
+    client = AsyncIOMotorClient(
+        os.environ["MONGO_URL"], event_listeners=[metrics.MongoCommandListener()]
+    )
+    db = client[os.environ["DB_NAME"]]
+
+    lease = LeaderLease(db, "wingo-engine")
+    engine = WingoEngine(db, schedule=schedule, seed=seed, lease=lease)
+    runner = EngineRunner(db, engine, PeriodArchive(db))
+
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+
+    await ensure_indexes(db)
+    exporter = None
+    if metrics_port:
+        exporter = await metrics.serve(metrics_host, metrics_port)
+        logger.info("Serving engine metrics on %s:%d/metrics", metrics_host, metrics_port)
+
+    lease_task = asyncio.create_task(lease.run(runner.start, runner.stop, runner.alive))
+    logger.info("Engine worker %s started (%s schedule)", lease.owner, schedule)
+
+    await stopping.wait()
+    logger.info("Engine worker shutting down")
+
+    lease_task.cancel()
+    await runner.stop()
+    await engine.drain(SHUTDOWN_GRACE)
+    await lease.release()
+    if exporter:
+        exporter.close()
+    client.close()
+
+
+def main():
+    load_dotenv(Path(__file__).parent / ".env")
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Run the Wingo game engine as its own process")
+    parser.add_argument("--schedule", default=os.environ.get("WINGO_SCHEDULE", SCHEDULE_STORED))
+    parser.add_argument("--seed", default=os.environ.get("SERVER_SEED"))
+    parser.add_argument("--metrics-host", default=os.environ.get("ENGINE_METRICS_HOST", "0.0.0.0"))
+    parser.add_argument(
+        "--metrics-port", type=int, default=int(os.environ.get("ENGINE_METRICS_PORT", "9102")),
+        help="port for the Prometheus /metrics endpoint, 0 to disable"
+    )
+    args = parser.parse_args()
+
+    asyncio.run(run_worker(args.schedule, args.seed, args.metrics_host, args.metrics_port))
+
+
+if __name__ == "__main__":
+    main()
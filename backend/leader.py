@@ -0,0 +1,121 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+LEASE_TTL = 15
+HEARTBEAT_INTERVAL = 5
+
+
+class LeaseLost(Exception):
+    pass
+
+
+class LeaderLease:
+    # Lease-based leader election on a single document in the leases
+    # collection. Each takeover increments a fencing token; leader-only
+    # writes stamp it on the documents they touch and refuse to overwrite a
+    # higher one, and the holder treats its lease as lost once a full TTL
+    # has passed without a successful renewal.
+
+    def __init__(self, db, name, ttl=LEASE_TTL, heartbeat=HEARTBEAT_INTERVAL):
+        self.db = db
+        self.name = name
+        self.ttl = ttl
+        self.heartbeat = heartbeat
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.token = None
+        self._valid_until = 0.0
+
+    @property
+    def is_leader(self):
+        return self.token is not None and time.monotonic() < self._valid_until
+
+    def fenced(self):
+        # Filter for leader-only writes: a document stamped by a newer
+        # leader is never touched again by an older one
+        return {"fence": {"$not": {"$gt": self.token}}}
+
+    async def _acquire(self):
+        now = datetime.utcnow()
+        started = time.monotonic()
+        try:
+            lease = await self.db.leases.find_one_and_update(
+                {"_id": self.name, "expires_at": {"$lt": now}},
+                {
+                    "$set": {"owner": self.owner, "expires_at": now + timedelta(seconds=self.ttl)},
+                    "$inc": {"token": 1},
+                },
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # Someone else holds an unexpired lease
+            return False
+
+        self.token = lease["token"]
+        self._valid_until = started + self.ttl
+        return True
+
+    async def _renew(self):
+        now = datetime.utcnow()
+        started = time.monotonic()
+        result = await self.db.leases.update_one(
+            {"_id": self.name, "owner": self.owner, "token": self.token},
+            {"$set": {"expires_at": now + timedelta(seconds=self.ttl)}}
+        )
+        if result.matched_count:
+            self._valid_until = started + self.ttl
+            return True
+        return False
+
+    async def release(self):
+        if self.token is not None:
+            await self.db.leases.update_one(
+                {"_id": self.name, "owner": self.owner, "token": self.token},
+                {"$set": {"expires_at": datetime.utcnow()}}
+            )
+            self.token = None
+
+    async def _step_down(self, on_demoted):
+        try:
+            await self.release()
+        finally:
+            self.token = None
+            await on_demoted()
+
+    async def run(self, on_elected, on_demoted, healthy=None):
+        while True:
+            try:
+                if self.token is None:
+                    if await self._acquire():
+                        logger.info("Acquired %s lease (token %s)", self.name, self.token)
+                        try:
+                            await on_elected()
+                        except Exception:
+                            logger.exception("Starting %s leader work failed, releasing the lease", self.name)
+                            await self._step_down(on_demoted)
+                elif healthy and not healthy():
+                    # Only hold the lease while the leader work is running,
+                    # otherwise no other worker can take over
+                    logger.error("%s leader work stopped, releasing the lease", self.name)
+                    await self._step_down(on_demoted)
+                elif not await self._renew() or not self.is_leader:
+                    logger.warning("Lost %s lease (token %s)", self.name, self.token)
+                    self.token = None
+                    await on_demoted()
+            except Exception:
+                logger.exception("Lease heartbeat for %s failed", self.name)
+                if self.token is not None and not self.is_leader:
+                    self.token = None
+                    await on_demoted()
+
+            await asyncio.sleep(self.heartbeat)
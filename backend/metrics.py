@@ -0,0 +1,217 @@
+import asyncio
+import bisect
+import contextvars
+import threading
+import time
+
+from pymongo import monitoring
+
+# -------------------------------
+# METRIC TYPES
+# -------------------------------
+#
+# Minimal in-process counters and histograms rendered in the Prometheus
+# text exposition format. Everything registers on the module-level REGISTRY.
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + (extra or [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels):
+        return tuple(labels.get(n, "") for n in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            lines += self._samples()
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self):
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+            for key, value in self._values.items()
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key, (None, 0))
+            if counts is None:
+                counts = [0] * (len(self.buckets) + 1)
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    def _samples(self):
+        lines = []
+        for key, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', le)])} {cumulative}"
+                )
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+REGISTRY = []
+
+
+def render():
+    lines = []
+    for metric in REGISTRY:
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
+
+# -------------------------------
+# APPLICATION METRICS
+# -------------------------------
+
+http_request_seconds = Histogram(
+    "wingo_http_request_seconds", "HTTP request latency", ("method", "route", "status")
+)
+http_request_mongo_ops = Histogram(
+    "wingo_http_request_mongo_ops", "MongoDB commands issued per HTTP request", ("route",),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+)
+mongo_command_seconds = Histogram(
+    "wingo_mongo_command_seconds", "MongoDB command latency", ("command",)
+)
+mongo_command_failures = Counter(
+    "wingo_mongo_command_failures_total", "Failed MongoDB commands", ("command",)
+)
+engine_reveal_lag_seconds = Histogram(
+    "wingo_engine_reveal_lag_seconds", "Delay between a period's end_time and its reveal", ("game_type",)
+)
+engine_settle_seconds = Histogram(
+    "wingo_engine_settle_seconds", "Time to settle one period", ("game_type",)
+)
+engine_settled_bets = Counter(
+    "wingo_engine_settled_bets_total", "Bets settled by the engine", ("game_type",)
+)
+
+# -------------------------------
+# MONGO COMMAND MONITORING
+# -------------------------------
+
+# Set per HTTP request by the middleware; Motor copies the context into its
+# executor threads, so the listener sees the request's counter
+request_mongo_ops = contextvars.ContextVar("request_mongo_ops", default=None)
+
+
+class MongoCommandListener(monitoring.CommandListener):
+
+    def started(self, event):
+        ops = request_mongo_ops.get()
+        if ops is not None:
+            ops[0] += 1
+
+    def succeeded(self, event):
+        mongo_command_seconds.observe(event.duration_micros / 1e6, command=event.command_name)
+
+    def failed(self, event):
+        mongo_command_failures.inc(command=event.command_name)
+
+
+async def http_metrics_middleware(request, call_next):
+    ops = [0]
+    token = request_mongo_ops.set(ops)
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        path = route.path if route else "unmatched"
+        http_request_seconds.observe(
+            time.perf_counter() - started, method=request.method, route=path, status=str(status)
+        )
+        http_request_mongo_ops.observe(ops[0], route=path)
+        request_mongo_ops.reset(token)
+
+# -------------------------------
+# STANDALONE EXPORTER
+# -------------------------------
+
+async def _scrape(reader, writer):
+    try:
+        request_line = await reader.readline()
+        while await reader.readline() not in (b"\r\n", b"\n", b""):
+            pass
+
+        parts = request_line.split()
+        if len(parts) >= 2 and parts[0] == b"GET" and parts[1].split(b"?")[0] == b"/metrics":
+            status, body = "200 OK", render().encode()
+        else:
+            status, body = "404 Not Found", b"Not found\n"
+
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: {CONTENT_TYPE}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+    finally:
+        writer.close()
+
+
+async def serve(host, port):
+    # /metrics for processes without the API app (the standalone engine
+    # worker); one scrape per connection
+    return await asyncio.start_server(_scrape, host, port)
@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+EVICT_INTERVAL = 60
+IDLE_EVICT_SECONDS = 600
+
+
+class MinesStore:
+    # Read cache for active Mines games. Games are inserted write-through on
+    # start and reads are served from memory, but every write is conditional
+    # on the stored version. With several API workers another process may
+    # have served the last click; a worker holding that stale copy misses on
+    # the version guard, drops its copy and the caller re-validates against
+    # the stored game instead of applying the click twice.
+
+    def __init__(self, db, evict_interval=EVICT_INTERVAL):
+        self.db = db
+        self.evict_interval = evict_interval
+        self._games = {}
+        self._touched = {}
+        self._task = None
+        self.conflicts = 0
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def create(self, game):
+        game["version"] = 0
+        await self.db.mines_games.insert_one(dict(game))
+        self._games[game["game_id"]] = game
+        self._touched[game["game_id"]] = time.monotonic()
+
+    async def get(self, game_id, user_id, fresh=False):
+        game = None if fresh else self._games.get(game_id)
+
+        if game is None:
+            # Not hot, or the caller saw a conflict - load the stored copy
+            game = await self.db.mines_games.find_one(
+                {"game_id": game_id, "status": "active"}, projection={"_id": 0}
+            )
+            if not game:
+                self._forget(game_id)
+                return None
+            self._games[game_id] = game
+
+        if game["user_id"] != user_id or game["status"] != "active":
+            return None
+
+        self._touched[game_id] = time.monotonic()
+        return game
+
+    @staticmethod
+    def _guard(game):
+        version = game.get("version", 0)
+        return {
+            "game_id": game["game_id"],
+            "status": "active",
+            # Games stored before versioning have no field yet
+            "version": version if version else {"$in": [0, None]},
+        }
+
+    async def update(self, game, **fields):
+        result = await self.db.mines_games.update_one(
+            self._guard(game), {"$set": fields, "$inc": {"version": 1}}
+        )
+
+        if result.modified_count != 1:
+            self.conflicts += 1
+            self._forget(game["game_id"])
+            return False
+
+        game.update(fields)
+        game["version"] = game.get("version", 0) + 1
+        return True
+
+    async def finish(self, game, status, **fields):
+        result = await self.db.mines_games.update_one(
+            self._guard(game),
+            {"$set": {
+                "status": status,
+                "revealed": game["revealed"],
+                "multiplier": game["multiplier"],
+                **fields,
+            }, "$inc": {"version": 1}}
+        )
+
+        self._forget(game["game_id"])
+        if result.modified_count != 1:
+            self.conflicts += 1
+            return False
+        return True
+
+    def _forget(self, game_id):
+        self._games.pop(game_id, None)
+        self._touched.pop(game_id, None)
+
+    def _evict_idle(self):
+        cutoff = time.monotonic() - IDLE_EVICT_SECONDS
+        for game_id, touched in list(self._touched.items()):
+            if touched < cutoff:
+                self._forget(game_id)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.evict_interval)
+            self._evict_idle()
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+
+    def stats(self):
+        return {"active": len(self._games), "conflicts": self.conflicts}
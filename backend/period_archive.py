@@ -0,0 +1,233 @@
+import asyncio
+import logging
+import os
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from wingo_engine import GAME_DURATIONS, PERIOD_ID_FORMAT, WingoEngine
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------
+# BIT-PACKED PERIOD ARCHIVE
+# -------------------------------
+#
+# One document per (game_type, UTC day) in wingo_archive:
+#   {"_id": "30s:20261017", "game_type", "day", "duration", "offset",
+#    "results": <bytes, 4 bits per slot, 0xF = no period>, "extras", "count"}
+#
+# Slot i of a day starts at day + offset + i * duration. Periods that do not
+# fall on that grid (the schedule phase changed after a restart) are kept in
+# "extras" keyed by period_id.
+
+ARCHIVE_AFTER = timedelta(days=int(os.environ.get("ARCHIVE_AFTER_DAYS", "7")))
+ARCHIVE_BATCH = 5000
+ARCHIVE_INTERVAL = 3600
+EMPTY = 0xF
+DAY_FORMAT = "%Y%m%d"
+
+
+def _get_nibble(packed, slot):
+    byte = packed[slot // 2]
+    return byte >> 4 if slot % 2 == 0 else byte & 0x0F
+
+
+def _set_nibble(packed, slot, value):
+    i = slot // 2
+    if slot % 2 == 0:
+        packed[i] = (packed[i] & 0x0F) | (value << 4)
+    else:
+        packed[i] = (packed[i] & 0xF0) | value
+
+
+class PeriodArchive:
+
+    def __init__(self, db, archive_after=ARCHIVE_AFTER):
+        self.db = db
+        self.archive_after = archive_after
+
+    # -----------------------------
+    # RETENTION JOB
+    # -----------------------------
+    async def archive_mode(self, game_type):
+
+        started = time.perf_counter()
+        cutoff = datetime.utcnow() - self.archive_after
+        archived = 0
+
+        while True:
+            # Unsettled and catch-up-skipped periods still have pending bets
+            # that need their period document; they stay until resolved
+            periods = await self.db.wingo_periods.find(
+                {
+                    "game_type": game_type, "revealed": True, "end_time": {"$lt": cutoff},
+                    "settled": True, "catchup_skipped": {"$ne": True},
+                },
+                projection={"period_id": 1, "result_number": 1, "start_time": 1}
+            ).sort("start_time", 1).limit(ARCHIVE_BATCH).to_list(ARCHIVE_BATCH)
+
+            if not periods:
+                break
+
+            by_day = defaultdict(list)
+            for period in periods:
+                by_day[period["start_time"].strftime(DAY_FORMAT)].append(period)
+
+            for day, day_periods in by_day.items():
+                await self._merge_day(game_type, day, day_periods)
+
+            await self.db.wingo_periods.delete_many(
+                {"_id": {"$in": [p["_id"] for p in periods]}}
+            )
+            archived += len(periods)
+
+        if archived:
+            logger.info(
+                "Archived %d %s periods in %.3fs",
+                archived, game_type, time.perf_counter() - started
+            )
+        return archived
+
+    async def _merge_day(self, game_type, day, periods):
+
+        duration = GAME_DURATIONS[game_type]
+        day_start = datetime.strptime(day, DAY_FORMAT)
+        doc_id = f"{game_type}:{day}"
+
+        doc = await self.db.wingo_archive.find_one({"_id": doc_id})
+        if doc:
+            offset = doc["offset"]
+            packed = bytearray(doc["results"])
+            extras = doc.get("extras", {})
+        else:
+            offset = int((periods[0]["start_time"] - day_start).total_seconds()) % duration
+            packed = bytearray([0xFF]) * ((86400 // duration + 1) // 2 + 1)
+            extras = {}
+
+        for period in periods:
+            seconds = int((period["start_time"] - day_start).total_seconds()) - offset
+            if seconds % duration == 0 and seconds >= 0:
+                _set_nibble(packed, seconds // duration, period["result_number"])
+            else:
+                extras[period["period_id"]] = period["result_number"]
+
+        count = sum(
+            (b >> 4 != EMPTY) + (b & 0x0F != EMPTY) for b in packed
+        ) + len(extras)
+
+        await self.db.wingo_archive.update_one(
+            {"_id": doc_id},
+            {"$set": {
+                "game_type": game_type,
+                "day": day,
+                "duration": duration,
+                "offset": offset,
+                "results": bytes(packed),
+                "extras": extras,
+                "count": count,
+            }},
+            upsert=True
+        )
+
+    async def run(self):
+        while True:
+            for game_type in GAME_DURATIONS:
+                try:
+                    await self.archive_mode(game_type)
+                except Exception:
+                    logger.exception("Archiving %s periods failed", game_type)
+            await asyncio.sleep(ARCHIVE_INTERVAL)
+
+    # -----------------------------
+    # RANGE QUERIES
+    # -----------------------------
+    async def query(self, game_type, from_period_id, to_period_id):
+
+        start = datetime.strptime(from_period_id, PERIOD_ID_FORMAT)
+        end = datetime.strptime(to_period_id, PERIOD_ID_FORMAT)
+
+        days = []
+        day = start.replace(hour=0, minute=0, second=0)
+        while day <= end:
+            days.append(f"{game_type}:{day.strftime(DAY_FORMAT)}")
+            day += timedelta(days=1)
+
+        results = []
+        async for doc in self.db.wingo_archive.find({"_id": {"$in": days}}).sort("_id", 1):
+            results += self._decode(doc, start, end)
+
+        results.sort(key=lambda r: r["period_id"])
+        return results
+
+    def _decode(self, doc, start, end):
+
+        duration = timedelta(seconds=doc["duration"])
+        first = datetime.strptime(doc["day"], DAY_FORMAT) + timedelta(seconds=doc["offset"])
+        packed = doc["results"]
+
+        # Only walk the slots that overlap the requested range
+        lo = max(0, (start - first) // duration)
+        hi = min(len(packed) * 2 - 1, (end - first) // duration)
+
+        results = []
+        for slot in range(lo, hi + 1):
+            number = _get_nibble(packed, slot)
+            start_time = first + slot * duration
+            if number == EMPTY or not start <= start_time <= end:
+                continue
+            results.append(self._result(doc["game_type"], start_time, duration, number))
+
+        for period_id, number in doc.get("extras", {}).items():
+            start_time = datetime.strptime(period_id, PERIOD_ID_FORMAT)
+            if start <= start_time <= end:
+                results.append(self._result(doc["game_type"], start_time, duration, number))
+
+        return results
+
+    async def latest_numbers(self, game_type, before, limit):
+
+        # Newest archived results that started before `before`, returned
+        # oldest first; _ids sort by day within a mode
+        chunks = []
+        remaining = limit
+
+        async for doc in self.db.wingo_archive.find(
+            {"_id": {"$gte": f"{game_type}:", "$lt": f"{game_type};"}}
+        ).sort("_id", -1):
+            numbers = [n for start_time, n in self._numbers(doc) if start_time < before]
+            chunks.append(numbers[-remaining:])
+            remaining -= len(chunks[-1])
+            if remaining <= 0:
+                break
+
+        return [n for chunk in reversed(chunks) for n in chunk]
+
+    def _numbers(self, doc):
+
+        duration = doc["duration"]
+        first = datetime.strptime(doc["day"], DAY_FORMAT) + timedelta(seconds=doc["offset"])
+        packed = doc["results"]
+
+        results = []
+        for slot in range(len(packed) * 2):
+            number = _get_nibble(packed, slot)
+            if number != EMPTY:
+                results.append((first + timedelta(seconds=slot * duration), number))
+
+        for period_id, number in doc.get("extras", {}).items():
+            results.append((datetime.strptime(period_id, PERIOD_ID_FORMAT), number))
+
+        results.sort()
+        return results
+
+    @staticmethod
+    def _result(game_type, start_time, duration, number):
+        return {
+            "game_type": game_type,
+            "period_id": start_time.strftime(PERIOD_ID_FORMAT),
+            "result_number": number,
+            "result_color": WingoEngine.color_for_number(number),
+            "start_time": start_time,
+            "end_time": start_time + duration,
+        }
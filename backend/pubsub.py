@@ -0,0 +1,50 @@
+import asyncio
+from collections import defaultdict
+
+import orjson
+
+SUBSCRIBER_QUEUE_SIZE = 64
+
+
+class Hub:
+    # In-process fan-out. Each event is encoded once and pushed onto every
+    # subscriber's bounded queue; a slow subscriber loses its oldest events
+    # instead of holding up the publisher.
+
+    def __init__(self, queue_size=SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._channels = defaultdict(set)
+        self._last = {}
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, channel):
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._channels[channel].add(queue)
+
+        # Late joiners get the latest event straight away
+        if channel in self._last:
+            queue.put_nowait(self._last[channel])
+
+        return queue
+
+    def unsubscribe(self, channel, queue):
+        self._channels[channel].discard(queue)
+
+    def publish(self, channel, event):
+        message = orjson.dumps(event)
+        self._last[channel] = message
+        self.published += 1
+
+        for queue in self._channels[channel]:
+            if queue.full():
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait(message)
+
+    def stats(self):
+        return {
+            "channels": {c: len(q) for c, q in self._channels.items()},
+            "published": self.published,
+            "dropped": self.dropped,
+        }
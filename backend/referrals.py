@@ -0,0 +1,207 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timezone
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from cache import TTLCache
+import stats
+
+logger = logging.getLogger(__name__)
+
+REFERRAL_COMMISSION = {
+    1: 0.02,
+    2: 0.03,
+    3: 0.04,
+    4: 0.05
+}
+
+# Share of the referrer's commission rate paid at each level up the chain
+REFERRAL_LEVEL_SHARES = {
+    1: 1.0,
+    2: 0.5,
+    3: 0.25
+}
+
+PAYOUT_INTERVAL = 300
+ACCRUE_INTERVAL = 5
+ACCRUE_BATCH = 5000
+REFERRER_CACHE_TTL = 300
+
+
+class ReferralLedger:
+    # Settlement flags referred bets with commission: "pending"; the accrual
+    # loop turns them into referral_ledger entries and the payout loop pays
+    # those out periodically with one aggregated $inc per referrer.
+
+    def __init__(self, db):
+        self.db = db
+        self._referrers = TTLCache(maxsize=100000, ttl=REFERRER_CACHE_TTL)
+
+    async def _load_referrers(self, ids):
+        missing = [i for i in ids if self._referrers.get(i) is None]
+        if missing:
+            async for r in self.db.users.find(
+                {"id": {"$in": missing}},
+                projection={"_id": 0, "id": 1, "vip_tier": 1, "referrer_id": 1}
+            ):
+                self._referrers.set(r["id"], r)
+        return {i: self._referrers.get(i) for i in ids if self._referrers.get(i)}
+
+    async def accrue(self, bets):
+        # bets: settled bets carrying the bettor's referrer_id
+        entries = []
+        now = datetime.now(timezone.utc)
+
+        level_refs = [(bet, bet["referrer_id"]) for bet in bets if bet.get("referrer_id")]
+        for level in sorted(REFERRAL_LEVEL_SHARES):
+            if not level_refs:
+                break
+
+            referrers = await self._load_referrers({ref_id for _, ref_id in level_refs})
+            next_level = []
+
+            for bet, ref_id in level_refs:
+                referrer = referrers.get(ref_id)
+                if not referrer:
+                    continue
+
+                rate = REFERRAL_COMMISSION.get(referrer.get("vip_tier", 1), 0.02)
+                entries.append({
+                    "referrer_id": ref_id,
+                    "user_id": bet["user_id"],
+                    "bet_id": bet["_id"],
+                    "game_type": bet["game_type"],
+                    "period_id": bet["period_id"],
+                    "level": level,
+                    "amount": bet["amount"] * rate * REFERRAL_LEVEL_SHARES[level],
+                    "payout_id": None,
+                    "created_at": now,
+                })
+                if referrer.get("referrer_id"):
+                    next_level.append((bet, referrer["referrer_id"]))
+
+            level_refs = next_level
+
+        if entries:
+            try:
+                await self.db.referral_ledger.insert_many(entries, ordered=False)
+            except BulkWriteError as exc:
+                # (bet_id, level) is unique, so re-settling a period is a no-op
+                if any(e["code"] != 11000 for e in exc.details.get("writeErrors", [])):
+                    raise
+        return len(entries)
+
+    async def accrue_pending(self, limit=ACCRUE_BATCH):
+        bets = await self.db.bets.find(
+            {"commission": "pending"},
+            projection={
+                "_id": 1, "user_id": 1, "amount": 1, "game_type": 1,
+                "period_id": 1, "referrer_id": 1
+            }
+        ).limit(limit).to_list(limit)
+
+        if not bets:
+            return 0
+
+        # Ledger entries are unique per (bet_id, level), so a crash before
+        # the flag is cleared only repeats no-op inserts
+        await self.accrue(bets)
+        await self.db.bets.update_many(
+            {"_id": {"$in": [bet["_id"] for bet in bets]}},
+            {"$set": {"commission": "accrued"}}
+        )
+        return len(bets)
+
+    async def run_accruals(self, interval=ACCRUE_INTERVAL):
+        while True:
+            try:
+                while await self.accrue_pending() == ACCRUE_BATCH:
+                    pass
+            except Exception:
+                logger.exception("Referral accrual failed")
+            await asyncio.sleep(interval)
+
+    async def payout(self):
+        payout_id = str(uuid.uuid4())
+
+        # Recorded before claiming, so a crash mid-claim leaves a "claiming"
+        # record that release_interrupted can find and undo
+        await self.db.referral_payouts.insert_one({
+            "_id": payout_id,
+            "status": "claiming",
+            "created_at": datetime.now(timezone.utc),
+        })
+
+        # Claim unpaid entries first so accruals that land mid-payout wait
+        # for the next run
+        claimed = await self.db.referral_ledger.update_many(
+            {"payout_id": None}, {"$set": {"payout_id": payout_id}}
+        )
+        if not claimed.modified_count:
+            await self.db.referral_payouts.delete_one({"_id": payout_id})
+            return {"referrers": 0, "entries": 0}
+
+        totals = await self.db.referral_ledger.aggregate([
+            {"$match": {"payout_id": payout_id}},
+            {"$group": {"_id": "$referrer_id", "amount": {"$sum": "$amount"}}},
+        ]).to_list(None)
+
+        # Marked before crediting; a payout left "pending" after a crash
+        # needs manual review rather than a blind retry
+        await self.db.referral_payouts.update_one(
+            {"_id": payout_id},
+            {"$set": {
+                "status": "pending",
+                "entries": claimed.modified_count,
+                "totals": {t["_id"]: t["amount"] for t in totals},
+            }}
+        )
+
+        await self.db.users.bulk_write([
+            UpdateOne({"id": t["_id"]}, {"$inc": {"balance": t["amount"]}})
+            for t in totals
+        ], ordered=False)
+        await stats.inc_active_balance(self.db, sum(t["amount"] for t in totals))
+
+        await self.db.referral_payouts.update_one(
+            {"_id": payout_id}, {"$set": {"status": "applied"}}
+        )
+
+        logger.info(
+            "Paid %d referral entries to %d referrers", claimed.modified_count, len(totals)
+        )
+        return {"referrers": len(totals), "entries": claimed.modified_count}
+
+    async def release_interrupted(self):
+        # Nothing is credited before a payout reaches "pending", so entries
+        # claimed by a "claiming" payout go back to the next run
+        released = 0
+        async for payout in self.db.referral_payouts.find({"status": "claiming"}):
+            result = await self.db.referral_ledger.update_many(
+                {"payout_id": payout["_id"]}, {"$set": {"payout_id": None}}
+            )
+            await self.db.referral_payouts.update_one(
+                {"_id": payout["_id"]}, {"$set": {"status": "released"}}
+            )
+            released += result.modified_count
+
+        if released:
+            logger.warning("Released %d referral entries from interrupted payouts", released)
+        return released
+
+    async def run(self):
+        await self.release_interrupted()
+
+        stuck = await self.db.referral_payouts.count_documents({"status": "pending"})
+        if stuck:
+            logger.warning("%d referral payouts were interrupted and need review", stuck)
+
+        while True:
+            await asyncio.sleep(PAYOUT_INTERVAL)
+            try:
+                await self.payout()
+            except Exception:
+                logger.exception("Referral payout failed")
@@ -0,0 +1,141 @@
+import itertools
+import logging
+import time
+from datetime import datetime
+
+import numpy as np
+
+from wingo_engine import GAME_DURATIONS
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------
+# RESULT STREAM STATISTICS
+# -------------------------------
+
+MAX_WINDOW = 100_000
+INITIAL_CAPACITY = 1024
+HOT_COLD_COUNT = 3
+
+COLORS = ["green", "red", "violet"]
+# number -> index into COLORS; the mixed results 0 and 5 count as violet
+COLOR_OF = np.array([2, 0, 1, 0, 1, 2, 1, 0, 1, 0], dtype=np.uint8)
+SIZES = ["small", "big"]
+
+
+def _runs(values):
+    # Run-length encode: returns (run values, run lengths), oldest first
+    if len(values) == 0:
+        return values, np.array([], dtype=np.int64)
+    boundaries = np.flatnonzero(np.diff(values)) + 1
+    starts = np.concatenate(([0], boundaries))
+    lengths = np.diff(np.concatenate((starts, [len(values)])))
+    return values[starts], lengths
+
+
+def _streaks(values, labels):
+    run_values, lengths = _runs(values)
+    if len(lengths) == 0:
+        return {"current": None, "longest": {}}
+
+    longest = {}
+    for code, label in enumerate(labels):
+        mask = run_values == code
+        longest[label] = int(lengths[mask].max()) if mask.any() else 0
+
+    return {
+        "current": {"value": labels[run_values[-1]], "length": int(lengths[-1])},
+        "longest": longest,
+    }
+
+
+class ResultStats:
+    # Each mode's results live in one contiguous uint8 array (oldest first)
+    # that grows by doubling, so appends are amortised O(1) and every window
+    # is a view over the tail. Warm-up tops the live periods up with the
+    # archive, since revealed periods are only kept live for a few days.
+
+    def __init__(self, db, archive=None):
+        self.db = db
+        self.archive = archive
+        self._data = {g: np.empty(INITIAL_CAPACITY, dtype=np.uint8) for g in GAME_DURATIONS}
+        self._size = dict.fromkeys(GAME_DURATIONS, 0)
+
+    def append(self, game_type, number):
+        data = self._data[game_type]
+        size = self._size[game_type]
+
+        if size == len(data):
+            # Past 2 * MAX_WINDOW compact instead of growing; older results
+            # are never queried
+            if size >= 2 * MAX_WINDOW:
+                data[:MAX_WINDOW] = data[size - MAX_WINDOW:size]
+                size = MAX_WINDOW
+            else:
+                grown = np.empty(len(data) * 2, dtype=np.uint8)
+                grown[:size] = data[:size]
+                self._data[game_type] = data = grown
+
+        data[size] = number
+        self._size[game_type] = size + 1
+
+    async def warm(self, game_type):
+        started = time.perf_counter()
+
+        periods = await self.db.wingo_periods.find(
+            {"game_type": game_type, "revealed": True},
+            projection={"_id": 0, "result_number": 1, "start_time": 1}
+        ).sort("start_time", -1).limit(MAX_WINDOW).to_list(MAX_WINDOW)
+
+        archived = []
+        if self.archive and len(periods) < MAX_WINDOW:
+            before = periods[-1]["start_time"] if periods else datetime.utcnow()
+            archived = await self.archive.latest_numbers(
+                game_type, before, MAX_WINDOW - len(periods)
+            )
+
+        numbers = np.fromiter(
+            itertools.chain(archived, (p["result_number"] for p in reversed(periods))),
+            dtype=np.uint8, count=len(archived) + len(periods)
+        )
+        capacity = max(INITIAL_CAPACITY, 1 << int(len(numbers)).bit_length())
+        data = np.empty(capacity, dtype=np.uint8)
+        data[:len(numbers)] = numbers
+
+        self._data[game_type] = data
+        self._size[game_type] = len(numbers)
+
+        logger.info(
+            "Loaded %d %s results (%d archived) into stats in %.3fs",
+            len(numbers), game_type, len(archived), time.perf_counter() - started
+        )
+
+    def window(self, game_type, size):
+        end = self._size[game_type]
+        return self._data[game_type][max(0, end - size):end]
+
+    def summary(self, game_type, size):
+        numbers = self.window(game_type, size)
+
+        counts = np.bincount(numbers, minlength=10)
+        by_frequency = np.argsort(counts, kind="stable")
+        colors = COLOR_OF[numbers]
+        sizes = (numbers >= 5).astype(np.uint8)
+
+        return {
+            "game_type": game_type,
+            "window": int(len(numbers)),
+            "numbers": {str(n): int(c) for n, c in enumerate(counts)},
+            "colors": {
+                label: int(c)
+                for label, c in zip(COLORS, np.bincount(colors, minlength=3))
+            },
+            "sizes": {
+                label: int(c)
+                for label, c in zip(SIZES, np.bincount(sizes, minlength=2))
+            },
+            "hot": [int(n) for n in by_frequency[::-1][:HOT_COLD_COUNT]],
+            "cold": [int(n) for n in by_frequency[:HOT_COLD_COUNT]],
+            "color_streaks": _streaks(colors, COLORS),
+            "size_streaks": _streaks(sizes, SIZES),
+        }
@@ -1,20 +1,43 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
-from wingo_engine import WingoEngine
-from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+from wingo_engine import (
+    WingoEngine, HISTORY_SIZE, BET_TYPES, PERIOD_ID_FORMAT, SCHEDULE_STORED,
+    resolve_mode
+)
+from pubsub import Hub
+from leader import LeaderLease
+from engine_worker import EngineRunner
+from bet_ingest import BetIngestor, PeriodClosed
+from mines_store import MinesStore
+from period_archive import PeriodArchive
+from result_stats import ResultStats, MAX_WINDOW
+from db_indexes import ensure_indexes, audit_indexes
+from cache import TTLCache
+from passwords import PasswordHasher
+from responses import MongoJSONResponse
+import stats
+import metrics
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, EmailStr
 import uuid
 from datetime import datetime, timezone, timedelta
-import bcrypt
 import jwt
 import asyncio
 import random
+import math
+import base64
+import csv
+import io
+import re
+from typing import List, Optional
+import orjson
 
 # -------------------------------
 # ENV + DB
@@ -24,38 +47,34 @@ ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / ".env")
 
 mongo_url = os.environ["MONGO_URL"]
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, event_listeners=[metrics.MongoCommandListener()])
 db = client[os.environ["DB_NAME"]]
 
-app = FastAPI()
+app = FastAPI(default_response_class=MongoJSONResponse)
 api_router = APIRouter(prefix="/api")
 security = HTTPBearer()
 
 JWT_SECRET = os.environ.get("JWT_SECRET", "change-me")
 JWT_ALGORITHM = "HS256"
 
-# -------------------------------
-# SERIALIZER
-# -------------------------------
-
-def serialize_mongo(data):
-    if isinstance(data, list):
-        return [serialize_mongo(item) for item in data]
-    if isinstance(data, dict):
-        new_data = {}
-        for key, value in data.items():
-            if isinstance(value, ObjectId):
-                new_data[key] = str(value)
-            else:
-                new_data[key] = serialize_mongo(value)
-        return new_data
-    return data
-
 # -------------------------------
 # INIT WINGO ENGINE
 # -------------------------------
 
-wingo_engine = WingoEngine(db)
+hub = Hub()
+period_archive = PeriodArchive(db)
+result_stats = ResultStats(db, period_archive)
+engine_lease = LeaderLease(db, "wingo-engine")
+wingo_engine = WingoEngine(
+    db,
+    hub,
+    result_stats=result_stats,
+    lease=engine_lease,
+    schedule=os.environ.get("WINGO_SCHEDULE", SCHEDULE_STORED),
+    seed=os.environ.get("SERVER_SEED"),
+)
+bet_ingestor = BetIngestor(db)
+mines_store = MinesStore(db)
 
 # -------------------------------
 # MODELS
@@ -70,6 +89,17 @@ class UserLogin(BaseModel):
     email: EmailStr
     password: str
 
+class BetRequest(BaseModel):
+    game_mode: str
+    bet_type: str
+    bet_value: str
+    bet_amount: float
+
+class ResultOverrideRequest(BaseModel):
+    game_mode: str
+    period_id: str
+    result_number: int
+
 class MinesStartRequest(BaseModel):
     bet_amount: float
     mines: int
@@ -81,18 +111,22 @@ class MinesRevealRequest(BaseModel):
 class MinesCashoutRequest(BaseModel):
     game_id: str
 
+class MinesBatchRevealRequest(BaseModel):
+    game_id: str
+    cells: List[int]
+    auto_cashout: Optional[float] = None
+
 # -------------------------------
 # AUTH HELPERS
 # -------------------------------
 
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+password_hasher = PasswordHasher()
 
-def verify_password(password: str, hashed: str) -> bool:
-    try:
-        return bcrypt.checkpw(password.encode(), hashed.encode())
-    except:
-        return False
+async def hash_password(password: str) -> str:
+    return await password_hasher.hash(password)
+
+async def verify_password(password: str, hashed: str) -> bool:
+    return await password_hasher.verify(password, hashed)
 
 def create_token(user_id: str, email: str, role: str) -> str:
     payload = {
@@ -103,18 +137,44 @@ def create_token(user_id: str, email: str, role: str) -> str:
     }
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
+# Identity and role only, all set at registration. Balance and VIP tier are
+# rewritten by settlement in the engine process, which cannot invalidate
+# this cache, so they are read on demand instead
+PRINCIPAL_FIELDS = {
+    "_id": 0, "id": 1, "email": 1, "name": 1, "role": 1, "referrer_id": 1
+}
+
+token_cache = TTLCache(maxsize=50000, ttl=60)
+principal_cache = TTLCache(maxsize=50000, ttl=30)
+
+async def get_balance(user_id: str) -> float:
+    user = await db.users.find_one({"id": user_id}, projection={"_id": 0, "balance": 1})
+    return user.get("balance", 0) if user else 0
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    try:
-        payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        user = await db.users.find_one({"id": payload["user_id"]})
+    token = credentials.credentials
+    payload = token_cache.get(token)
+
+    if payload is None:
+        try:
+            payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        except jwt.ExpiredSignatureError:
+            raise HTTPException(status_code=401, detail="Token expired")
+        except jwt.InvalidTokenError:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        token_cache.set(token, payload)
+    elif payload["exp"] < datetime.now(timezone.utc).timestamp():
+        token_cache.pop(token)
+        raise HTTPException(status_code=401, detail="Token expired")
+
+    user = principal_cache.get(payload["user_id"])
+    if user is None:
+        user = await db.users.find_one({"id": payload["user_id"]}, projection=PRINCIPAL_FIELDS)
         if not user:
             raise HTTPException(status_code=401, detail="User not found")
-        user.pop("password", None)
-        return serialize_mongo(user)
-    except jwt.ExpiredSignatureError:
-        raise HTTPException(status_code=401, detail="Token expired")
-    except jwt.InvalidTokenError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+        principal_cache.set(payload["user_id"], user)
+
+    return dict(user)
 
 async def get_admin_user(user=Depends(get_current_user)):
     if user.get("role") != "admin":
@@ -127,36 +187,48 @@ async def get_admin_user(user=Depends(get_current_user)):
 
 @api_router.post("/auth/register")
 async def register(data: UserRegister):
-    if await db.users.find_one({"email": data.email}):
+    if await db.users.find_one({"email": data.email}, projection={"_id": 1}):
         raise HTTPException(status_code=400, detail="Email exists")
 
     user_id = str(uuid.uuid4())
 
-    await db.users.insert_one({
-        "id": user_id,
-        "email": data.email,
-        "name": data.name,
-        "password": hash_password(data.password.strip()),
-        "balance": 0,
-        "vip_tier": 1,
-        "role": "user",
-        "created_at": datetime.now(timezone.utc),
-    })
+    try:
+        await db.users.insert_one({
+            "id": user_id,
+            "email": data.email,
+            "name": data.name,
+            "password": await hash_password(data.password.strip()),
+            "balance": 0,
+            "vip_tier": 1,
+            "role": "user",
+            "created_at": datetime.now(timezone.utc),
+        })
+    except DuplicateKeyError:
+        # A concurrent registration passed the check above first
+        raise HTTPException(status_code=400, detail="Email exists")
+    await stats.inc_user_count(db)
 
     token = create_token(user_id, data.email, "user")
     return {"token": token}
 
 @api_router.post("/auth/login")
 async def login(data: UserLogin):
-    user = await db.users.find_one({"email": data.email})
+    user = await db.users.find_one({"email": data.email}, projection={"_id": 0})
 
-    if not user or not verify_password(data.password.strip(), user.get("password", "")):
+    password = data.password.strip()
+    if not user or not await verify_password(password, user.get("password", "")):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
+    if password_hasher.needs_rehash(user["password"]):
+        await db.users.update_one(
+            {"id": user["id"]},
+            {"$set": {"password": await hash_password(password)}}
+        )
+
     token = create_token(user["id"], user["email"], user["role"])
     user.pop("password", None)
 
-    return {"token": token, "user": serialize_mongo(user)}
+    return MongoJSONResponse({"token": token, "user": user})
 
 # -------------------------------
 # ADMIN ROUTES
@@ -164,23 +236,295 @@ async def login(data: UserLogin):
 
 @api_router.get("/admin/dashboard-stats")
 async def admin_dashboard(admin=Depends(get_admin_user)):
-    total_users = await db.users.count_documents({"role": "user"})
-    users = await db.users.find({"role": "user"}).to_list(None)
-    total_balance = sum(u.get("balance", 0) for u in users)
+    return await stats.dashboard(db)
 
+@api_router.get("/admin/index-audit")
+async def admin_index_audit(admin=Depends(get_admin_user)):
+    report = await audit_indexes(db)
     return {
-        "total_users": total_users,
-        "today_deposits": 0,
-        "today_withdrawals": 0,
-        "total_active_balance": total_balance,
+        "collscans": sum(1 for r in report if r["collscan"]),
+        "queries": report,
     }
 
+@api_router.get("/admin/engine-status")
+async def admin_engine_status(admin=Depends(get_admin_user)):
+    return wingo_engine.engine_status()
+
+@api_router.get("/admin/hash-pool")
+async def admin_hash_pool(admin=Depends(get_admin_user)):
+    return password_hasher.stats()
+
+USER_LIST_FIELDS = {
+    "_id": 0, "id": 1, "email": 1, "name": 1, "balance": 1, "vip_tier": 1, "created_at": 1
+}
+USER_SORT_FIELDS = {"created_at", "balance", "email"}
+USER_EXPORT_BATCH = 1000
+
+def _encode_cursor(sort: str, value, user_id: str) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps([sort, value, user_id])).decode()
+
+def _decode_cursor(cursor: str, sort: str):
+    # The sort field is part of the cursor, so a cursor from another sort
+    # order is rejected instead of being compared against the wrong type
+    try:
+        cursor_sort, value, user_id = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if cursor_sort != sort or not isinstance(user_id, str):
+            raise ValueError(cursor_sort)
+        if sort == "created_at" and value is not None:
+            value = datetime.fromisoformat(value)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return value, user_id
+
+def _user_filter(q: Optional[str], vip_tier: Optional[int], min_balance: Optional[float]):
+    query = {"role": "user"}
+    if q:
+        query["email"] = {"$regex": f"^{re.escape(q)}"}
+    if vip_tier is not None:
+        query["vip_tier"] = vip_tier
+    if min_balance is not None:
+        query["balance"] = {"$gte": min_balance}
+    return query
+
+@api_router.get("/admin/push-hub")
+async def admin_push_hub(admin=Depends(get_admin_user)):
+    return hub.stats()
+
+@api_router.get("/admin/bet-ingest")
+async def admin_bet_ingest(admin=Depends(get_admin_user)):
+    return bet_ingestor.stats()
+
+@api_router.get("/admin/mines-store")
+async def admin_mines_store(admin=Depends(get_admin_user)):
+    return mines_store.stats()
+
+@api_router.get("/admin/wingo/preview")
+async def admin_wingo_preview(mode: str, period_id: Optional[str] = None, admin=Depends(get_admin_user)):
+    game_type = resolve_mode(mode)
+
+    if period_id is None:
+        return await wingo_engine.preview_next_results(game_type, admin)
+
+    try:
+        period = await wingo_engine.get_period(game_type, period_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid period id")
+    if not period:
+        raise HTTPException(status_code=404, detail="Period not found")
+    return period
+
+@api_router.post("/admin/wingo/override")
+async def admin_wingo_override(data: ResultOverrideRequest, admin=Depends(get_admin_user)):
+    game_type = resolve_mode(data.game_mode)
+
+    if not 0 <= data.result_number <= 9:
+        raise HTTPException(status_code=400, detail="Invalid result number")
+
+    if not await wingo_engine.set_override(game_type, data.period_id, data.result_number):
+        raise HTTPException(status_code=404, detail="Period not found or already closed")
+    return {"game_type": game_type, "period_id": data.period_id, "result_number": data.result_number}
+
 @api_router.get("/admin/users")
-async def admin_users(admin=Depends(get_admin_user)):
-    users = await db.users.find({"role": "user"}).to_list(None)
-    for u in users:
-        u.pop("password", None)
-    return serialize_mongo(users)
+async def admin_users(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    sort: str = "created_at",
+    order: str = "desc",
+    q: Optional[str] = None,
+    vip_tier: Optional[int] = None,
+    min_balance: Optional[float] = None,
+    admin=Depends(get_admin_user),
+):
+    if sort not in USER_SORT_FIELDS or order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="Invalid sort")
+
+    direction = 1 if order == "asc" else -1
+    op = "$gt" if direction == 1 else "$lt"
+    query = _user_filter(q, vip_tier, min_balance)
+
+    # Keyset pagination on (sort field, id) so deep pages cost the same as the first
+    if cursor:
+        value, last_id = _decode_cursor(cursor, sort)
+        query = {"$and": [query, {"$or": [
+            {sort: {op: value}},
+            {sort: value, "id": {op: last_id}},
+        ]}]}
+
+    users = await db.users.find(query, projection=USER_LIST_FIELDS).sort(
+        [(sort, direction), ("id", direction)]
+    ).limit(limit).to_list(limit)
+
+    next_cursor = None
+    if len(users) == limit:
+        last = users[-1]
+        next_cursor = _encode_cursor(sort, last.get(sort), last["id"])
+
+    return MongoJSONResponse({"items": users, "next_cursor": next_cursor})
+
+@api_router.get("/admin/users/export")
+async def admin_users_export(
+    format: str = "ndjson",
+    q: Optional[str] = None,
+    vip_tier: Optional[int] = None,
+    min_balance: Optional[float] = None,
+    admin=Depends(get_admin_user),
+):
+    if format not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="Invalid format")
+
+    cursor = db.users.find(
+        _user_filter(q, vip_tier, min_balance), projection=USER_LIST_FIELDS
+    ).sort("id", 1).batch_size(USER_EXPORT_BATCH)
+
+    columns = [f for f in USER_LIST_FIELDS if f != "_id"]
+
+    async def rows():
+        if format == "csv":
+            yield ",".join(columns) + "\n"
+        async for u in cursor:
+            if format == "ndjson":
+                yield orjson.dumps(u) + b"\n"
+            else:
+                buf = io.StringIO()
+                csv.writer(buf).writerow([
+                    u.get(c).isoformat() if isinstance(u.get(c), datetime) else u.get(c, "")
+                    for c in columns
+                ])
+                yield buf.getvalue()
+
+    media_type = "application/x-ndjson" if format == "ndjson" else "text/csv"
+    return StreamingResponse(
+        rows(),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=users.{format}"},
+    )
+
+# -------------------------------
+# LIVE GAME EVENTS
+# -------------------------------
+
+SSE_KEEPALIVE = 15
+ARCHIVE_MAX_RANGE = timedelta(days=7)
+
+@api_router.get("/game/history")
+async def game_history(request: Request, mode: str, limit: int = Query(50, ge=1, le=HISTORY_SIZE)):
+    game_type = resolve_mode(mode)
+    results, etag = wingo_engine.recent_results(game_type, limit)
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    return MongoJSONResponse(results, headers=headers)
+
+@api_router.get("/game/stats")
+async def game_stats(mode: str, window: int = Query(100, ge=1, le=MAX_WINDOW)):
+    return result_stats.summary(resolve_mode(mode), window)
+
+@api_router.get("/game/archive")
+async def game_archive(mode: str, from_period: str, to_period: str):
+    game_type = resolve_mode(mode)
+
+    try:
+        start = datetime.strptime(from_period, PERIOD_ID_FORMAT)
+        end = datetime.strptime(to_period, PERIOD_ID_FORMAT)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid period id")
+
+    if end < start or end - start > ARCHIVE_MAX_RANGE:
+        raise HTTPException(status_code=400, detail="Invalid period range")
+
+    return await period_archive.query(game_type, from_period, to_period)
+
+@api_router.websocket("/ws/game/{mode}")
+async def game_events_ws(websocket: WebSocket, mode: str):
+    try:
+        game_type = resolve_mode(mode)
+    except HTTPException:
+        await websocket.close(code=1008)
+        return
+
+    await websocket.accept()
+    queue = hub.subscribe(game_type)
+    try:
+        while True:
+            message = await queue.get()
+            await websocket.send_text(message.decode())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        hub.unsubscribe(game_type, queue)
+
+@api_router.get("/game/stream/{mode}")
+async def game_events_sse(mode: str):
+    game_type = resolve_mode(mode)
+
+    async def events():
+        queue = hub.subscribe(game_type)
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), SSE_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                yield b"data: " + message + b"\n\n"
+        finally:
+            hub.unsubscribe(game_type, queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# -------------------------------
+# WINGO BETS
+# -------------------------------
+
+MIN_BET = 10
+BET_CUTOFF = timedelta(seconds=2)
+
+@api_router.post("/game/bet")
+async def place_bet(data: BetRequest, user=Depends(get_current_user)):
+    game_type = resolve_mode(data.game_mode)
+
+    if data.bet_value not in BET_TYPES.get(data.bet_type, ()):
+        raise HTTPException(status_code=400, detail="Invalid bet")
+
+    if data.bet_amount < MIN_BET:
+        raise HTTPException(status_code=400, detail="Invalid bet amount")
+
+    period = wingo_engine.open_period(game_type, BET_CUTOFF)
+    if not period:
+        raise HTTPException(status_code=409, detail="Betting closed for this period")
+
+    if not await bet_ingestor.debit(user["id"], data.bet_amount):
+        raise HTTPException(status_code=400, detail="Insufficient balance")
+
+    try:
+        bet = await bet_ingestor.submit({
+            "id": str(uuid.uuid4()),
+            "user_id": user["id"],
+            "game_type": game_type,
+            "period_id": period["period_id"],
+            "bet_type": data.bet_type,
+            "bet_value": data.bet_value,
+            "amount": data.bet_amount,
+            "status": "pending",
+            "created_at": datetime.now(timezone.utc),
+        })
+    except PeriodClosed:
+        raise HTTPException(status_code=409, detail="Betting closed for this period")
+    except Exception:
+        raise HTTPException(status_code=503, detail="Bet could not be recorded")
+
+    return {
+        "bet_id": bet["id"],
+        "period_id": bet["period_id"],
+        "status": bet["status"],
+        "win_amount": 0,
+    }
 
 # -------------------------------
 # MINES GAME
@@ -191,13 +535,14 @@ TOTAL_CELLS = 25
 @api_router.post("/mines/start")
 async def start_mines(data: MinesStartRequest, user=Depends(get_current_user)):
 
-    if data.bet_amount <= 0 or data.bet_amount > user["balance"]:
+    if data.bet_amount <= 0 or data.bet_amount > await get_balance(user["id"]):
         raise HTTPException(status_code=400, detail="Invalid bet amount")
 
     if data.mines < 1 or data.mines > 24:
         raise HTTPException(status_code=400, detail="Invalid mines count")
 
     await db.users.update_one({"id": user["id"]}, {"$inc": {"balance": -data.bet_amount}})
+    await stats.inc_active_balance(db, -data.bet_amount)
 
     mine_positions = random.sample(range(TOTAL_CELLS), data.mines)
 
@@ -213,73 +558,160 @@ async def start_mines(data: MinesStartRequest, user=Depends(get_current_user)):
         "created_at": datetime.now(timezone.utc)
     }
 
-    await db.mines_games.insert_one(game)
-    game.pop("mine_positions")
+    await mines_store.create(game)
+
+    response = dict(game)
+    response.pop("mine_positions")
+
+    return response
+
+def mines_multiplier(mines: int, revealed: int) -> float:
+    # Inverse of the chance of picking `revealed` safe cells in a row, less
+    # the 2% edge; rises with every click up to and including a cleared board
+    odds = math.comb(TOTAL_CELLS, revealed) / math.comb(TOTAL_CELLS - mines, revealed)
+    return round(odds * 0.98, 4)
 
-    return serialize_mongo(game)
+def board_cleared(game, revealed) -> bool:
+    return len(revealed) >= TOTAL_CELLS - game["mines"]
+
+async def credit_cashout(game, user_id, payout, **fields):
+    if not await mines_store.finish(game, "cashed_out", payout=payout, **fields):
+        return False
+
+    await db.users.update_one({"id": user_id}, {"$inc": {"balance": payout}})
+    await stats.inc_active_balance(db, payout)
+    return True
+
+# Writes are guarded by the stored game version. A miss means another
+# worker moved the game on, so reload it and validate the request again.
+MINES_ATTEMPTS = (False, True)
+
+def mines_conflict():
+    return HTTPException(status_code=409, detail="Game was updated, please retry")
 
 @api_router.post("/mines/reveal")
 async def reveal_cell(data: MinesRevealRequest, user=Depends(get_current_user)):
 
-    game = await db.mines_games.find_one({
-        "game_id": data.game_id,
-        "user_id": user["id"],
-        "status": "active"
-    })
+    for fresh in MINES_ATTEMPTS:
+        game = await mines_store.get(data.game_id, user["id"], fresh=fresh)
 
-    if not game:
-        raise HTTPException(status_code=404, detail="Game not found")
+        if not game:
+            raise HTTPException(status_code=404, detail="Game not found")
 
-    if data.cell_index in game["mine_positions"]:
-        await db.mines_games.update_one({"game_id": data.game_id}, {"$set": {"status": "lost"}})
-        return {"result": "mine", "status": "lost"}
+        if not 0 <= data.cell_index < TOTAL_CELLS or data.cell_index in game["revealed"]:
+            raise HTTPException(status_code=400, detail="Invalid cell")
 
-    revealed = game["revealed"] + [data.cell_index]
-    safe_cells = TOTAL_CELLS - game["mines"]
+        if data.cell_index in game["mine_positions"]:
+            if await mines_store.finish(game, "lost"):
+                return {"result": "mine", "status": "lost"}
+            continue
 
-    multiplier = round((safe_cells / (safe_cells - len(revealed))) * 0.98, 4)
+        revealed = game["revealed"] + [data.cell_index]
+        multiplier = mines_multiplier(game["mines"], len(revealed))
 
-    await db.mines_games.update_one(
-        {"game_id": data.game_id},
-        {"$set": {"revealed": revealed, "multiplier": multiplier}}
-    )
+        if board_cleared(game, revealed):
+            payout = round(game["bet_amount"] * multiplier, 2)
+            game = dict(game, revealed=revealed, multiplier=multiplier)
+            if await credit_cashout(game, user["id"], payout):
+                return {"result": "safe", "multiplier": multiplier, "status": "cashed_out", "payout": payout}
+            continue
+
+        if await mines_store.update(game, revealed=revealed, multiplier=multiplier):
+            return {"result": "safe", "multiplier": multiplier}
+
+    raise mines_conflict()
+
+@api_router.post("/mines/reveal-batch")
+async def reveal_cells(data: MinesBatchRevealRequest, user=Depends(get_current_user)):
+
+    for fresh in MINES_ATTEMPTS:
+        game = await mines_store.get(data.game_id, user["id"], fresh=fresh)
+
+        if not game:
+            raise HTTPException(status_code=404, detail="Game not found")
+
+        if (
+            not data.cells
+            or len(set(data.cells)) != len(data.cells)
+            or any(not 0 <= c < TOTAL_CELLS or c in game["revealed"] for c in data.cells)
+        ):
+            raise HTTPException(status_code=400, detail="Invalid cells")
 
-    return {"result": "safe", "multiplier": multiplier}
+        mines = set(game["mine_positions"])
+        revealed = list(game["revealed"])
+        multiplier = game["multiplier"]
+        results = []
+        lost = False
+
+        for cell in data.cells:
+            if cell in mines:
+                results.append({"cell": cell, "result": "mine"})
+                lost = True
+                break
+
+            revealed.append(cell)
+            multiplier = mines_multiplier(game["mines"], len(revealed))
+            results.append({"cell": cell, "result": "safe", "multiplier": multiplier})
+
+            if data.auto_cashout and multiplier >= data.auto_cashout:
+                break
+
+        if lost:
+            game = dict(game, revealed=revealed, multiplier=multiplier)
+            if await mines_store.finish(game, "lost"):
+                return {"results": results, "status": "lost", "multiplier": multiplier}
+            continue
+
+        if board_cleared(game, revealed) or (data.auto_cashout and multiplier >= data.auto_cashout):
+            payout = round(game["bet_amount"] * multiplier, 2)
+            game = dict(game, revealed=revealed, multiplier=multiplier)
+            if not await credit_cashout(game, user["id"], payout):
+                continue
+
+            return {"results": results, "status": "cashed_out", "multiplier": multiplier, "payout": payout}
+
+        if await mines_store.update(game, revealed=revealed, multiplier=multiplier):
+            return {"results": results, "status": "active", "multiplier": multiplier}
+
+    raise mines_conflict()
 
 @api_router.post("/mines/cashout")
 async def cashout(data: MinesCashoutRequest, user=Depends(get_current_user)):
 
-    game = await db.mines_games.find_one({
-        "game_id": data.game_id,
-        "user_id": user["id"],
-        "status": "active"
-    })
+    for fresh in MINES_ATTEMPTS:
+        game = await mines_store.get(data.game_id, user["id"], fresh=fresh)
 
-    if not game:
-        raise HTTPException(status_code=404, detail="Game not found")
+        if not game:
+            raise HTTPException(status_code=404, detail="Game not found")
 
-    payout = round(game["bet_amount"] * game["multiplier"], 2)
+        payout = round(game["bet_amount"] * game["multiplier"], 2)
 
-    await db.users.update_one({"id": user["id"]}, {"$inc": {"balance": payout}})
-    await db.mines_games.update_one({"game_id": data.game_id}, {"$set": {"status": "cashed_out"}})
+        if await credit_cashout(game, user["id"], payout):
+            return {"payout": payout}
 
-    return {"payout": payout}
+    raise mines_conflict()
 
 # -------------------------------
 # ENGINE STARTUP
 # -------------------------------
 
+# Only the lease holder reveals, settles and runs the periodic jobs; every
+# other worker serves HTTP and follows the leader's reveals. With
+# ENGINE_MODE=external the engine runs in engine_worker.py and API
+# processes never take the lease.
+ENGINE_MODE = os.environ.get("ENGINE_MODE", "embedded")
+engine_runner = EngineRunner(db, wingo_engine, period_archive)
+
 @app.on_event("startup")
 async def startup():
-    for game in ["30s", "60s", "180s", "300s"]:
-        existing = await db.wingo_periods.find_one({"game_type": game})
-        if not existing:
-            await wingo_engine.generate_future_periods(game, 300)
+    await ensure_indexes(db)
+    bet_ingestor.start()
+    mines_store.start()
+    await stats.rebuild_totals(db)
 
-    asyncio.create_task(wingo_engine.run_engine("30s"))
-    asyncio.create_task(wingo_engine.run_engine("60s"))
-    asyncio.create_task(wingo_engine.run_engine("180s"))
-    asyncio.create_task(wingo_engine.run_engine("300s"))
+    engine_runner.follow()
+    if ENGINE_MODE == "embedded":
+        asyncio.create_task(engine_lease.run(engine_runner.start, engine_runner.demote, engine_runner.alive))
 
 # -------------------------------
 # APP CONFIG
@@ -287,6 +719,12 @@ async def startup():
 
 app.include_router(api_router)
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+app.middleware("http")(metrics.http_metrics_middleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -299,4 +737,9 @@ logging.basicConfig(level=logging.INFO)
 
 @app.on_event("shutdown")
 async def shutdown():
+    await engine_runner.stop()
+    await engine_lease.release()
+    await bet_ingestor.close()
+    await mines_store.close()
+    password_hasher.shutdown()
     client.close()
@@ -0,0 +1,103 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------
+# MATERIALIZED COUNTERS
+# -------------------------------
+#
+# stats collection layout:
+#   {"_id": "totals", "total_users": int, "total_active_balance": float}
+#   {"_id": "daily:YYYY-MM-DD", "deposits": float, "withdrawals": float, ...}
+
+TOTALS_ID = "totals"
+
+
+def _daily_id(day=None):
+    day = day or datetime.now(timezone.utc).date()
+    return f"daily:{day.isoformat()}"
+
+
+async def inc_active_balance(db, amount):
+    if amount:
+        await db.stats.update_one(
+            {"_id": TOTALS_ID}, {"$inc": {"total_active_balance": amount}}, upsert=True
+        )
+
+
+async def inc_user_count(db, count=1):
+    await db.stats.update_one(
+        {"_id": TOTALS_ID}, {"$inc": {"total_users": count}}, upsert=True
+    )
+
+
+async def record_deposit(db, amount):
+    await db.stats.update_one(
+        {"_id": _daily_id()}, {"$inc": {"deposits": amount, "deposit_count": 1}}, upsert=True
+    )
+
+
+async def record_withdrawal(db, amount):
+    await db.stats.update_one(
+        {"_id": _daily_id()}, {"$inc": {"withdrawals": amount, "withdrawal_count": 1}}, upsert=True
+    )
+
+
+async def rebuild_totals(db):
+    result = await db.users.aggregate([
+        {"$match": {"role": "user"}},
+        {"$group": {
+            "_id": None,
+            "total_users": {"$sum": 1},
+            "total_active_balance": {"$sum": {"$ifNull": ["$balance", 0]}},
+        }},
+    ]).to_list(1)
+
+    totals = result[0] if result else {"total_users": 0, "total_active_balance": 0}
+    totals.pop("_id", None)
+    totals["rebuilt_at"] = datetime.now(timezone.utc)
+
+    await db.stats.update_one({"_id": TOTALS_ID}, {"$set": totals}, upsert=True)
+    return totals
+
+
+async def dashboard(db):
+    totals = await db.stats.find_one({"_id": TOTALS_ID}) or await rebuild_totals(db)
+    today = await db.stats.find_one({"_id": _daily_id()}) or {}
+
+    return {
+        "total_users": totals.get("total_users", 0),
+        "today_deposits": today.get("deposits", 0),
+        "today_withdrawals": today.get("withdrawals", 0),
+        "total_active_balance": totals.get("total_active_balance", 0),
+    }
+
+# -------------------------------
+# DAILY ROLLUP
+# -------------------------------
+
+async def daily_rollup(db, day):
+    totals = await rebuild_totals(db)
+    await db.stats.update_one(
+        {"_id": _daily_id(day)},
+        {"$set": {
+            "closing_users": totals["total_users"],
+            "closing_active_balance": totals["total_active_balance"],
+            "rolled_up_at": datetime.now(timezone.utc),
+        }},
+        upsert=True
+    )
+
+
+async def run_daily_rollup(db):
+    while True:
+        now = datetime.now(timezone.utc)
+        midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), timezone.utc)
+        await asyncio.sleep((midnight - now).total_seconds())
+
+        try:
+            await daily_rollup(db, now.date())
+        except Exception:
+            logger.exception("Daily stats rollup failed")
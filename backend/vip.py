@@ -0,0 +1,88 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+logger = logging.getLogger(__name__)
+
+# Minimum 30-day wager volume for each VIP tier
+VIP_THRESHOLDS = {
+    1: 0,
+    2: 10_000,
+    3: 50_000,
+    4: 200_000
+}
+
+WAGER_WINDOW_DAYS = 30
+RECONCILE_INTERVAL = 3600
+
+# -------------------------------
+# ROLLING WAGER COUNTERS
+# -------------------------------
+#
+# Each user carries wager_buckets {"YYYYMMDD": amount}, a running wager_30d
+# and a lifetime wager_total. Settlement adds to today's bucket and both
+# totals with $inc; the reconciliation job drops buckets that have left the
+# window and recomputes wager_30d and vip_tier server-side.
+
+
+def wager_day(now=None):
+    return (now or datetime.now(timezone.utc)).strftime("%Y%m%d")
+
+
+def tier_for(wager_30d):
+    return max(t for t, threshold in VIP_THRESHOLDS.items() if wager_30d >= threshold)
+
+
+def wager_update(user, amount, day):
+    # Returns ($inc, $set) fragments for one user's settlement update
+    inc = {
+        "wager_30d": amount,
+        "wager_total": amount,
+        f"wager_buckets.{day}": amount,
+    }
+
+    tier = tier_for(user.get("wager_30d", 0) + amount)
+    promote = {"vip_tier": tier} if tier > user.get("vip_tier", 1) else {}
+
+    return inc, promote
+
+
+def _tier_expression():
+    return {"$switch": {
+        "branches": [
+            {"case": {"$gte": ["$wager_30d", threshold]}, "then": tier}
+            for tier, threshold in sorted(VIP_THRESHOLDS.items(), reverse=True)
+        ],
+        "default": 1,
+    }}
+
+
+async def reconcile(db):
+    cutoff = wager_day(datetime.now(timezone.utc) - timedelta(days=WAGER_WINDOW_DAYS - 1))
+
+    result = await db.users.update_many(
+        {"wager_buckets": {"$exists": True}},
+        [
+            {"$set": {"wager_buckets": {"$arrayToObject": {"$filter": {
+                "input": {"$objectToArray": "$wager_buckets"},
+                "cond": {"$gte": ["$$this.k", cutoff]},
+            }}}}},
+            {"$set": {"wager_30d": {"$sum": {"$map": {
+                "input": {"$objectToArray": "$wager_buckets"},
+                "in": "$$this.v",
+            }}}}},
+            {"$set": {"vip_tier": _tier_expression()}},
+        ]
+    )
+
+    logger.info("Reconciled wager counters for %d users", result.modified_count)
+    return result.modified_count
+
+
+async def run_reconciliation(db):
+    while True:
+        await asyncio.sleep(RECONCILE_INTERVAL)
+        try:
+            await reconcile(db)
+        except Exception:
+            logger.exception("Wager reconciliation failed")
@@ -1,8 +1,22 @@
 import asyncio
+import hashlib
+import heapq
+import hmac
+import itertools
+import logging
 import random
-from datetime import datetime, timedelta
+import time
+import zlib
+from collections import defaultdict, deque
+from datetime import datetime, timedelta, timezone
 from fastapi import HTTPException
-from bson import ObjectId
+from leader import LeaseLost
+from pymongo import ReturnDocument, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from referrals import ReferralLedger
+from vip import wager_day, wager_update
+import metrics
+import stats
 
 GAME_DURATIONS = {
     "30s": 30,
@@ -18,57 +32,292 @@ VIP_MULTIPLIERS = {
     4: 10.5
 }
 
-REFERRAL_COMMISSION = {
-    1: 0.02,
-    2: 0.03,
-    3: 0.04,
-    4: 0.05
+# Color and big/small payouts; number bets pay VIP_MULTIPLIERS. 0 and 5 are
+# red-violet and green-violet: violet bets pay in full, the red or green
+# bet on them pays MIXED_COLOR_MULTIPLIER
+COLOR_MULTIPLIERS = {
+    "green": 2,
+    "red": 2,
+    "violet": 4.5
 }
 
+MIXED_COLOR_MULTIPLIER = 1.5
+
+BIGSMALL_MULTIPLIER = 2
+
+BET_TYPES = {
+    "number": {str(n) for n in range(10)},
+    "color": set(COLOR_MULTIPLIERS),
+    "bigsmall": {"big", "small"}
+}
+
+# Mode names used by the frontend routes
+MODE_ALIASES = {
+    "1min": "60s",
+    "3min": "180s",
+    "5min": "300s"
+}
+
+INSERT_BATCH_SIZE = 500
+LOW_WATERMARK = 50
+
+HISTORY_SIZE = 200
+
+FOLLOW_INTERVAL = 1
+FOLLOW_BATCH = 500
+SCHEDULER_RETRY_DELAY = 2
+
+SETTLE_SHARDS = 8
+SETTLE_CONCURRENCY = 4
+SHARD_MIN_BETS = 500
+SETTLED_KEYS_KEPT = 50
+
+CATCHUP_MAX_AGE = timedelta(hours=6)
+SETTLE_SWEEP_INTERVAL = 30
+SETTLE_SWEEP_GRACE = timedelta(seconds=60)
+CATCHUP_CONCURRENCY = 8
+
+# "stored": periods are pre-generated into wingo_periods.
+# "derived": periods come from the clock and results from HMAC(seed, mode,
+# period); only revealed periods and admin overrides are persisted.
+SCHEDULE_STORED = "stored"
+SCHEDULE_DERIVED = "derived"
+
+EPOCH = datetime(1970, 1, 1)
+PERIOD_ID_FORMAT = "%Y%m%d%H%M%S"
+
+logger = logging.getLogger(__name__)
+
+
+def resolve_mode(mode):
+    game_type = MODE_ALIASES.get(mode, mode)
+    if game_type not in GAME_DURATIONS:
+        raise HTTPException(status_code=404, detail="Unknown game mode")
+    return game_type
+
+
+def _epoch_ms(dt):
+    return int(dt.replace(tzinfo=timezone.utc).timestamp() * 1000)
+
 
 class WingoEngine:
 
-    def __init__(self, db):
+    def __init__(
+        self, db, hub=None, schedule=SCHEDULE_STORED, seed=None, result_stats=None, lease=None
+    ):
+        if schedule not in (SCHEDULE_STORED, SCHEDULE_DERIVED):
+            raise ValueError(f"Unknown schedule mode: {schedule}")
+        if schedule == SCHEDULE_DERIVED and not seed:
+            raise ValueError("A server seed is required for the derived schedule")
+
         self.db = db
+        self.hub = hub
+        self.result_stats = result_stats
+        self.lease = lease
+        self.referrals = ReferralLedger(db)
+        self.schedule = schedule
+        self.seed = seed.encode() if seed else None
+        self._last_end = {}
+        self._topups = {}
+        self._settlements = set()
+        self._settling = set()
+        self.reveal_lag = {}
+        self.history = {g: deque(maxlen=HISTORY_SIZE) for g in GAME_DURATIONS}
+        self.current = {}
 
     # -----------------------------
     # RANDOM RESULT GENERATOR
     # -----------------------------
-    def generate_random_result(self):
-        number = random.randint(0, 9)
-
-        color = (
+    @staticmethod
+    def color_for_number(number):
+        return (
             "green" if number in [1, 3, 7, 9]
             else "red" if number in [2, 4, 6, 8]
-            else "violet"
+            else "red-violet" if number == 0
+            else "green-violet"
         )
 
-        return number, color
+    def bet_multiplier(self, bet, result_number, vip):
+
+        bet_type = bet.get("bet_type", "number")
+        value = bet["bet_value"]
+
+        if bet_type == "number":
+            return VIP_MULTIPLIERS.get(vip, 9) if int(value) == result_number else 0
+
+        if bet_type == "color":
+            colors = self.color_for_number(result_number).split("-")
+            if value not in colors:
+                return 0
+            if value != "violet" and len(colors) > 1:
+                return MIXED_COLOR_MULTIPLIER
+            return COLOR_MULTIPLIERS[value]
+
+        if bet_type == "bigsmall":
+            size = "big" if result_number >= 5 else "small"
+            return BIGSMALL_MULTIPLIER if value == size else 0
+
+        return 0
+
+    def generate_random_result(self):
+        number = random.randint(0, 9)
+        return number, self.color_for_number(number)
 
     # -----------------------------
     # PRE-GENERATE FUTURE PERIODS
     # -----------------------------
     async def generate_future_periods(self, game_type, count=500):
 
+        started = time.perf_counter()
         duration = GAME_DURATIONS[game_type]
         now = datetime.utcnow()
 
-        for i in range(count):
-            start_time = now + timedelta(seconds=i * duration)
-            period_id = start_time.strftime("%Y%m%d%H%M%S")
+        # Continue after the last scheduled period so top-ups never overlap
+        last = await self.db.wingo_periods.find_one(
+            {"game_type": game_type},
+            sort=[("start_time", -1)],
+            projection={"end_time": 1}
+        )
+        first_start = max(now, last["end_time"]) if last else now
 
-            number, color = self.generate_random_result()
+        numbers = random.choices(range(10), k=count)
 
-            await self.db.wingo_periods.insert_one({
+        docs = []
+        for i, number in enumerate(numbers):
+            start_time = first_start + timedelta(seconds=i * duration)
+            docs.append({
                 "game_type": game_type,
-                "period_id": period_id,
+                "period_id": start_time.strftime(PERIOD_ID_FORMAT),
                 "result_number": number,
-                "result_color": color,
+                "result_color": self.color_for_number(number),
                 "start_time": start_time,
                 "end_time": start_time + timedelta(seconds=duration),
                 "revealed": False
             })
 
+        inserted = 0
+        for i in range(0, len(docs), INSERT_BATCH_SIZE):
+            try:
+                result = await self.db.wingo_periods.insert_many(
+                    docs[i:i + INSERT_BATCH_SIZE], ordered=False
+                )
+                inserted += len(result.inserted_ids)
+            except BulkWriteError as exc:
+                # Slots another top-up already filled; the rest still land
+                inserted += exc.details.get("nInserted", 0)
+                logger.warning(
+                    "Generating %s periods: %d writes rejected",
+                    game_type, len(exc.details.get("writeErrors", []))
+                )
+
+        elapsed = time.perf_counter() - started
+        logger.info(
+            "Generated %d %s periods in %.3fs", inserted, game_type, elapsed
+        )
+
+        return {"inserted": inserted, "elapsed": elapsed}
+
+    # -----------------------------
+    # DERIVED SCHEDULE
+    # -----------------------------
+    def derived_result(self, game_type, period_id):
+
+        digest = hmac.new(
+            self.seed, f"{game_type}:{period_id}".encode(), hashlib.sha256
+        ).digest()
+        return int.from_bytes(digest[:8], "big") % 10
+
+    def period_at(self, game_type, when):
+
+        duration = GAME_DURATIONS[game_type]
+        elapsed = int((when - EPOCH).total_seconds())
+        start_time = EPOCH + timedelta(seconds=elapsed - elapsed % duration)
+        period_id = start_time.strftime(PERIOD_ID_FORMAT)
+        number = self.derived_result(game_type, period_id)
+
+        return {
+            "game_type": game_type,
+            "period_id": period_id,
+            "result_number": number,
+            "result_color": self.color_for_number(number),
+            "start_time": start_time,
+            "end_time": start_time + timedelta(seconds=duration),
+            "revealed": False
+        }
+
+    async def _apply_overrides(self, game_type, periods):
+
+        by_id = {p["period_id"]: p for p in periods}
+        async for override in self.db.wingo_overrides.find(
+            {"game_type": game_type, "period_id": {"$in": list(by_id)}}
+        ):
+            period = by_id[override["period_id"]]
+            period["result_number"] = override["result_number"]
+            period["result_color"] = self.color_for_number(override["result_number"])
+        return periods
+
+    def _grid_period(self, game_type, period_id):
+
+        # None for malformed ids and ids that are not on the period grid
+        try:
+            start_time = datetime.strptime(period_id, PERIOD_ID_FORMAT)
+        except ValueError:
+            return None
+        period = self.period_at(game_type, start_time)
+        return period if period["period_id"] == period_id else None
+
+    async def get_period(self, game_type, period_id):
+
+        if self.schedule == SCHEDULE_DERIVED:
+            period = self._grid_period(game_type, period_id)
+            if not period:
+                return None
+            await self._apply_overrides(game_type, [period])
+            return period
+
+        return await self.db.wingo_periods.find_one(
+            {"game_type": game_type, "period_id": period_id}, projection={"_id": 0}
+        )
+
+    async def set_override(self, game_type, period_id, number):
+
+        # Only periods that have not ended can be overridden, in both modes
+        now = datetime.utcnow()
+
+        if self.schedule == SCHEDULE_DERIVED:
+            period = self._grid_period(game_type, period_id)
+            if not period or period["end_time"] <= now:
+                return False
+            if await self.db.wingo_periods.find_one(
+                {"game_type": game_type, "period_id": period_id, "revealed": True},
+                projection={"_id": 1}
+            ):
+                return False
+
+            await self.db.wingo_overrides.update_one(
+                {"game_type": game_type, "period_id": period_id},
+                {"$set": {"result_number": number}},
+                upsert=True
+            )
+        else:
+            result = await self.db.wingo_periods.update_one(
+                {
+                    "game_type": game_type,
+                    "period_id": period_id,
+                    "revealed": False,
+                    "end_time": {"$gt": now},
+                },
+                {"$set": {"result_number": number, "result_color": self.color_for_number(number)}}
+            )
+            if result.matched_count != 1:
+                return False
+
+        current = self.current.get(game_type)
+        if current and current["period_id"] == period_id:
+            current["result_number"] = number
+            current["result_color"] = self.color_for_number(number)
+        return True
+
     # -----------------------------
     # ADMIN PREVIEW (X and X+1)
     # -----------------------------
@@ -77,15 +326,16 @@ class WingoEngine:
         if current_user["role"] != "admin":
             raise HTTPException(status_code=403, detail="Admin only")
 
-        cursor = self.db.wingo_periods.find(
-            {"game_type": game_type, "revealed": False}
-        ).sort("start_time", 1)
-
-        upcoming = []
-        async for p in cursor:
-            upcoming.append(p)
-            if len(upcoming) == 2:
-                break
+        if self.schedule == SCHEDULE_DERIVED:
+            current = self.period_at(game_type, datetime.utcnow())
+            upcoming = await self._apply_overrides(game_type, [
+                current, self.period_at(game_type, current["end_time"])
+            ])
+        else:
+            upcoming = await self.db.wingo_periods.find(
+                {"game_type": game_type, "revealed": False},
+                projection={"_id": 0}
+            ).sort("start_time", 1).limit(2).to_list(2)
 
         return {
             "current_period": upcoming[0] if len(upcoming) > 0 else None,
@@ -97,76 +347,656 @@ class WingoEngine:
     # -----------------------------
     async def settle_bets(self, period):
 
-        bets_cursor = self.db.bets.find({
-            "period_id": period["period_id"],
-            "game_type": period["game_type"],
-            "status": "pending"
-        })
+        started = time.perf_counter()
+        key = {"game_type": period["game_type"], "period_id": period["period_id"]}
 
-        async for bet in bets_cursor:
+        bets = await self.db.bets.find({**key, "status": "pending"}).to_list(None)
 
-            user = await self.db.users.find_one({"_id": ObjectId(bet["user_id"])})
-            vip = user.get("vip_tier", 1)
+        if not bets:
+            await self.db.wingo_periods.update_one(key, {"$set": {"settled": True}})
+            return {"bets": 0, "users": 0, "shards": 0}
 
-            win = bet["bet_value"] == period["result_number"]
+        # The shard count is fixed on first attempt so a resumed settlement
+        # splits bets exactly as the interrupted one did
+        state = await self.db.wingo_periods.find_one(
+            key, projection={"settle_shards": 1, "settled_shards": 1}
+        ) or {}
+        shards = state.get("settle_shards")
+        if not shards:
+            shards = SETTLE_SHARDS if len(bets) >= SHARD_MIN_BETS else 1
+            await self.db.wingo_periods.update_one(key, {"$set": {"settle_shards": shards}})
+        done = set(state.get("settled_shards", []))
 
-            if win:
-                multiplier = VIP_MULTIPLIERS.get(vip, 9)
-                payout = bet["amount"] * multiplier
+        groups = defaultdict(list)
+        for bet in bets:
+            groups[zlib.crc32(bet["user_id"].encode()) % shards].append(bet)
 
-                await self.db.users.update_one(
-                    {"_id": user["_id"]},
-                    {"$inc": {"balance": payout}}
-                )
+        semaphore = asyncio.Semaphore(SETTLE_CONCURRENCY)
+
+        async def run_shard(shard):
+            async with semaphore:
+                users = await self._settle_shard(period, groups[shard])
+            await self.db.wingo_periods.update_one(key, {"$addToSet": {"settled_shards": shard}})
+            return users
+
+        settled_users = await asyncio.gather(
+            *(run_shard(shard) for shard in range(shards) if shard not in done)
+        )
+
+        await self.db.wingo_periods.update_one(key, {"$set": {"settled": True}})
+
+        metrics.engine_settle_seconds.observe(
+            time.perf_counter() - started, game_type=period["game_type"]
+        )
+        metrics.engine_settled_bets.inc(len(bets), game_type=period["game_type"])
+
+        return {"bets": len(bets), "users": sum(settled_users), "shards": shards}
+
+    async def _settle_shard(self, period, bets):
+
+        if not bets:
+            return 0
 
-            # Referral Commission (Level 1)
-            if user.get("referrer_id"):
-                referrer = await self.db.users.find_one(
-                    {"_id": ObjectId(user["referrer_id"])}
+        # Users are credited at most once per period: the settlement key is
+        # pushed onto a short per-user list in the same update and checked
+        # in its filter, so re-running a shard after a crash skips them
+        settle_key = f'{period["game_type"]}:{period["period_id"]}'
+
+        user_ids = {bet["user_id"] for bet in bets}
+        users = {
+            u["id"]: u async for u in self.db.users.find(
+                {"id": {"$in": list(user_ids)}},
+                projection={
+                    "id": 1, "vip_tier": 1, "referrer_id": 1, "wager_30d": 1, "settled_keys": 1
+                }
+            )
+        }
+
+        deltas = defaultdict(float)
+        wagers = defaultdict(float)
+        bet_ops = []
+        lost_ids = []
+
+        for bet in bets:
+            user = users.get(bet["user_id"])
+            if not user:
+                continue
+
+            wagers[user["id"]] += bet["amount"]
+            multiplier = self.bet_multiplier(
+                bet, period["result_number"], user.get("vip_tier", 1)
+            )
+
+            # Referred bets are flagged for ReferralLedger.run_accruals,
+            # which computes commissions off the settlement path
+            commission = (
+                {"referrer_id": user["referrer_id"], "commission": "pending"}
+                if user.get("referrer_id") else {}
+            )
+
+            if multiplier:
+                payout = bet["amount"] * multiplier
+                deltas[user["id"]] += payout
+                bet_ops.append(UpdateOne(
+                    {"_id": bet["_id"]},
+                    {"$set": {"status": "settled", "win": True, "payout": payout, **commission}}
+                ))
+            elif commission:
+                bet_ops.append(UpdateOne(
+                    {"_id": bet["_id"]},
+                    {"$set": {"status": "settled", "win": False, "payout": 0, **commission}}
+                ))
+            else:
+                lost_ids.append(bet["_id"])
+
+        # One update per user: winnings, wager counters and any promotion
+        day = wager_day()
+        user_ops = []
+        credited = 0
+        for uid, wagered in wagers.items():
+            if settle_key in users[uid].get("settled_keys", ()):
+                continue
+            credited += deltas.get(uid, 0)
+            inc, promote = wager_update(users[uid], wagered, day)
+            if deltas.get(uid):
+                inc["balance"] = deltas[uid]
+            update = {
+                "$inc": inc,
+                "$push": {"settled_keys": {"$each": [settle_key], "$slice": -SETTLED_KEYS_KEPT}},
+            }
+            if promote:
+                update["$set"] = promote
+            user_ops.append(UpdateOne({"id": uid, "settled_keys": {"$ne": settle_key}}, update))
+
+        if user_ops:
+            result = await self.db.users.bulk_write(user_ops, ordered=False)
+            # Users credited by an earlier run are left out above; if another
+            # run credited some in between, leave the counter to rebuild_totals
+            # rather than count their winnings twice
+            if result.modified_count == len(user_ops):
+                await stats.inc_active_balance(self.db, credited)
+            else:
+                logger.warning(
+                    "Settlement %s: %d of %d users already credited, active balance not updated",
+                    settle_key, len(user_ops) - result.modified_count, len(user_ops)
                 )
 
-                if referrer:
-                    ref_vip = referrer.get("vip_tier", 1)
-                    commission_rate = REFERRAL_COMMISSION.get(ref_vip, 0.02)
+        if lost_ids:
+            bet_ops.append(UpdateMany(
+                {"_id": {"$in": lost_ids}},
+                {"$set": {"status": "settled", "win": False, "payout": 0}}
+            ))
+
+        if bet_ops:
+            await self.db.bets.bulk_write(bet_ops, ordered=False)
+
+        return len(wagers)
 
-                    commission = bet["amount"] * commission_rate
+    # -----------------------------
+    # BACKGROUND SCHEDULE TOP-UP
+    # -----------------------------
+    def _schedule_topup(self, game_type, count=200):
 
-                    await self.db.users.update_one(
-                        {"_id": referrer["_id"]},
-                        {"$inc": {"balance": commission}}
-                    )
+        task = self._topups.get(game_type)
+        if task and not task.done():
+            return
 
-            await self.db.bets.update_one(
-                {"_id": bet["_id"]},
-                {"$set": {"status": "settled", "win": win}}
+        async def topup():
+            remaining = await self.db.wingo_periods.count_documents(
+                {"game_type": game_type, "revealed": False}
+            )
+            if remaining < LOW_WATERMARK:
+                await self.generate_future_periods(game_type, count)
+
+        task = asyncio.create_task(topup())
+        task.add_done_callback(lambda task: self._topup_done(game_type, task))
+        self._topups[game_type] = task
+
+    def _topup_done(self, game_type, task):
+
+        if not task.cancelled() and task.exception():
+            logger.error(
+                "Top-up of %s periods failed, retrying on the next reveal", game_type,
+                exc_info=task.exception()
             )
 
     # -----------------------------
-    # CONTINUOUS GAME LOOP
+    # BETTING WINDOW
     # -----------------------------
-    async def run_engine(self, game_type):
+    def open_period(self, game_type, cutoff=timedelta(0)):
 
-        duration = GAME_DURATIONS[game_type]
+        # Bets close `cutoff` before the period's scheduled end
+        period = self.current.get(game_type)
+        if not period:
+            return None
 
-        while True:
+        now = datetime.utcnow()
+        if period["start_time"] <= now < period["end_time"] - cutoff:
+            return period
+        return None
 
-            next_period = await self.db.wingo_periods.find_one(
-                {"game_type": game_type, "revealed": False},
-                sort=[("start_time", 1)]
+    # -----------------------------
+    # CATCH-UP OF OVERDUE PERIODS
+    # -----------------------------
+    async def catch_up(self, game_type, max_age=CATCHUP_MAX_AGE):
+
+        if self.schedule == SCHEDULE_DERIVED:
+            return await self._catch_up_derived(game_type, max_age)
+
+        started = time.perf_counter()
+        now = datetime.utcnow()
+        cutoff = now - max_age
+
+        # Periods beyond the cap are closed without settlement; their bets
+        # stay pending for manual review
+        skipped = await self.db.wingo_periods.update_many(
+            {"game_type": game_type, "revealed": False, "end_time": {"$lt": cutoff}},
+            {"$set": {"revealed": True, "catchup_skipped": True}}
+        )
+        if skipped.modified_count:
+            logger.warning(
+                "Skipped %d %s periods older than %s",
+                skipped.modified_count, game_type, max_age
             )
 
-            if not next_period:
+        overdue = await self.db.wingo_periods.find(
+            {"game_type": game_type, "revealed": False, "end_time": {"$lte": now}},
+            projection={"period_id": 1, "game_type": 1, "result_number": 1, "end_time": 1}
+        ).to_list(None)
+
+        if not overdue:
+            return {"revealed": 0, "settled": 0, "skipped": skipped.modified_count}
+
+        await self.db.wingo_periods.update_many(
+            {"_id": {"$in": [p["_id"] for p in overdue]}},
+            {"$set": {"revealed": True, "settled": False}}
+        )
+
+        settled = await self._settle_overdue(game_type, overdue, started)
+
+        return {
+            "revealed": len(overdue),
+            "settled": settled,
+            "skipped": skipped.modified_count,
+        }
+
+    async def resume_settlements(self, game_type, max_age=CATCHUP_MAX_AGE, min_age=timedelta(0)):
+
+        # Periods revealed before a crash, or whose settlement task failed,
+        # that never completed; settle_bets skips the shards already
+        # checkpointed
+        now = datetime.utcnow()
+        unfinished = await self.db.wingo_periods.find(
+            {
+                "game_type": game_type,
+                "revealed": True,
+                "settled": False,
+                "end_time": {"$gte": now - max_age, "$lte": now - min_age},
+            },
+            projection={"period_id": 1, "game_type": 1, "result_number": 1, "end_time": 1}
+        ).to_list(None)
+        unfinished = [p for p in unfinished if (game_type, p["period_id"]) not in self._settling]
+
+        if not unfinished:
+            return 0
+
+        logger.info("Resuming settlement of %d %s periods", len(unfinished), game_type)
+        return await self._settle_overdue(game_type, unfinished, time.perf_counter())
+
+    async def _catch_up_derived(self, game_type, max_age):
+
+        started = time.perf_counter()
+        now = datetime.utcnow()
+        duration = timedelta(seconds=GAME_DURATIONS[game_type])
+
+        last = await self.db.wingo_periods.find_one(
+            {"game_type": game_type, "revealed": True},
+            sort=[("start_time", -1)],
+            projection={"end_time": 1}
+        )
+        if not last:
+            return {"revealed": 0, "settled": 0, "skipped": 0}
+
+        # Periods older than the cap are never materialised; their bets
+        # stay pending for manual review
+        first_start = max(last["end_time"], self.period_at(game_type, now - max_age)["start_time"])
+        skipped = int((first_start - last["end_time"]) / duration)
+        if skipped:
+            logger.warning("Skipped %d %s periods older than %s", skipped, game_type, max_age)
+
+        overdue = []
+        start_time = first_start
+        while start_time + duration <= now:
+            overdue.append(self.period_at(game_type, start_time))
+            start_time += duration
+
+        if not overdue:
+            return {"revealed": 0, "settled": 0, "skipped": skipped}
+
+        await self._apply_overrides(game_type, overdue)
+        for period in overdue:
+            period["revealed"] = True
+            period["settled"] = False
+
+        for i in range(0, len(overdue), INSERT_BATCH_SIZE):
+            try:
+                await self.db.wingo_periods.insert_many(
+                    [dict(p) for p in overdue[i:i + INSERT_BATCH_SIZE]], ordered=False
+                )
+            except BulkWriteError:
+                # Already materialised by an earlier run
+                pass
+
+        self._last_end[game_type] = overdue[-1]["end_time"]
+        settled = await self._settle_overdue(game_type, overdue, started)
+
+        return {"revealed": len(overdue), "settled": settled, "skipped": skipped}
+
+    async def _settle_overdue(self, game_type, overdue, started):
+
+        with_bets = set(await self.db.bets.distinct("period_id", {
+            "game_type": game_type,
+            "status": "pending",
+            "period_id": {"$in": [p["period_id"] for p in overdue]}
+        }))
+        to_settle = [p for p in overdue if p["period_id"] in with_bets]
+
+        semaphore = asyncio.Semaphore(CATCHUP_CONCURRENCY)
+        done = 0
+
+        async def settle(period):
+            nonlocal done
+            async with semaphore:
+                try:
+                    await self.settle_bets(period)
+                except Exception:
+                    logger.exception("Settling %s %s failed", game_type, period["period_id"])
+                    return
+            done += 1
+            if done % 100 == 0 or done == len(to_settle):
+                logger.info(
+                    "Catch-up %s: settled %d/%d periods", game_type, done, len(to_settle)
+                )
+
+        await asyncio.gather(*(settle(p) for p in to_settle))
+
+        await self.db.wingo_periods.update_many(
+            {"game_type": game_type, "period_id": {"$in": [
+                p["period_id"] for p in overdue if p["period_id"] not in with_bets
+            ]}},
+            {"$set": {"settled": True}}
+        )
+
+        logger.info(
+            "Caught up %d %s periods (%d with bets) in %.3fs",
+            len(overdue), game_type, len(to_settle), time.perf_counter() - started
+        )
+
+        return len(to_settle)
+
+    # -----------------------------
+    # REVEALED RESULTS RING BUFFER
+    # -----------------------------
+    def _remember(self, period):
+
+        self.history[period["game_type"]].appendleft({
+            "id": period["period_id"],
+            "period_id": period["period_id"],
+            "game_type": period["game_type"],
+            "result_number": period["result_number"],
+            "result_color": period["result_color"],
+            "created_at": period["end_time"].isoformat() + "Z",
+        })
+
+    async def warm_history(self, game_type):
+
+        periods = await self.db.wingo_periods.find(
+            {"game_type": game_type, "revealed": True},
+            projection={
+                "period_id": 1, "game_type": 1, "result_number": 1,
+                "result_color": 1, "end_time": 1
+            }
+        ).sort("start_time", -1).limit(HISTORY_SIZE).to_list(HISTORY_SIZE)
+
+        self.history[game_type].clear()
+        for period in reversed(periods):
+            self._remember(period)
+
+    def recent_results(self, game_type, limit=HISTORY_SIZE):
+
+        buffer = self.history[game_type]
+        etag = f'"{game_type}-{buffer[0]["period_id"]}"' if buffer else f'"{game_type}-empty"'
+        return list(itertools.islice(buffer, limit)), etag
+
+    def _announce(self, period):
+
+        self._remember(period)
+        if self.result_stats:
+            self.result_stats.append(period["game_type"], period["result_number"])
+        self._publish(period["game_type"], "close", period)
+        self._publish(period["game_type"], "result", period, {
+            "result_number": period["result_number"],
+            "result_color": period["result_color"],
+        })
+
+    # -----------------------------
+    # PUSH EVENTS
+    # -----------------------------
+    def _publish(self, game_type, event, period, extra=None):
+
+        if not self.hub:
+            return
+
+        message = {
+            "type": event,
+            "game_type": game_type,
+            "period_id": period["period_id"],
+            "start_ts": _epoch_ms(period["start_time"]),
+            "end_ts": _epoch_ms(period["end_time"]),
+            "server_ts": _epoch_ms(datetime.utcnow()),
+        }
+        if extra:
+            message.update(extra)
+
+        self.hub.publish(game_type, message)
+
+    # -----------------------------
+    # DEADLINE SCHEDULER (ALL MODES)
+    # -----------------------------
+    async def _next_deadline(self, game_type):
+
+        if self.schedule == SCHEDULE_DERIVED:
+            # Follow on contiguously from the last reveal so no period is
+            # skipped even when a reveal runs late
+            when = self._last_end.get(game_type) or datetime.utcnow()
+            next_period = self.period_at(game_type, when)
+        else:
+            while True:
+                next_period = await self.db.wingo_periods.find_one(
+                    {"game_type": game_type, "revealed": False},
+                    sort=[("start_time", 1)]
+                )
+
+                if next_period:
+                    break
+
                 await self.generate_future_periods(game_type, 200)
+
+            self._schedule_topup(game_type)
+
+        self.current[game_type] = next_period
+        self._publish(game_type, "open", next_period)
+
+        # Anchor every deadline to the period's absolute end_time so sleep
+        # overshoot and settlement time never accumulate into drift
+        remaining = (next_period["end_time"] - datetime.utcnow()).total_seconds()
+        return time.monotonic() + remaining, game_type, next_period
+
+    async def reveal_period(self, period):
+
+        game_type = period["game_type"]
+
+        if self.lease and not self.lease.is_leader:
+            raise LeaseLost(f"{game_type} {period['period_id']} not revealed without the engine lease")
+
+        # Only the first reveal of a period wins, and never one from a lease
+        # holder older than the token already stamped on the period
+        fence = {"fence": self.lease.token} if self.lease else {}
+        fenced = self.lease.fenced() if self.lease else {}
+        key = {"game_type": game_type, "period_id": period["period_id"]}
+
+        if self.schedule == SCHEDULE_DERIVED:
+            await self._apply_overrides(game_type, [period])
+            period["revealed"] = True
+            period["settled"] = False
+            try:
+                await self.db.wingo_periods.update_one(
+                    {**key, "revealed": {"$ne": True}, **fenced},
+                    {"$set": {**period, **fence}},
+                    upsert=True
+                )
+                revealed = True
+            except DuplicateKeyError:
+                revealed = False
+        else:
+            # Re-read the stored result so overrides written by another
+            # process (API workers) since scheduling are honoured
+            stored = await self.db.wingo_periods.find_one_and_update(
+                {"_id": period["_id"], "revealed": False, **fenced},
+                {"$set": {"revealed": True, "settled": False, **fence}},
+                return_document=ReturnDocument.AFTER
+            )
+            revealed = stored is not None
+            if revealed:
+                period.update(stored)
+
+        if not revealed and self.lease and await self.db.wingo_periods.find_one(
+            {**key, "fence": {"$gt": self.lease.token}}, projection={"_id": 1}
+        ):
+            raise LeaseLost(f"{game_type} {period['period_id']} is fenced by a newer engine leader")
+
+        self._last_end[game_type] = period["end_time"]
+
+        if not revealed:
+            logger.warning("%s %s was already revealed", game_type, period["period_id"])
+            return
+
+        lag = (datetime.utcnow() - period["end_time"]).total_seconds()
+        self.reveal_lag[game_type] = lag
+        metrics.engine_reveal_lag_seconds.observe(max(lag, 0), game_type=game_type)
+
+        self._announce(period)
+
+        key = (game_type, period["period_id"])
+        task = asyncio.create_task(self.settle_bets(period))
+        self._settlements.add(task)
+        self._settling.add(key)
+        task.add_done_callback(lambda task: self._settlement_done(key, period, task))
+
+    def _settlement_done(self, key, period, task):
+
+        self._settlements.discard(task)
+        self._settling.discard(key)
+        if task.cancelled():
+            return
+        if task.exception():
+            logger.error(
+                "Settlement of %s %s failed, the sweep will retry it", *key,
+                exc_info=task.exception()
+            )
+            return
+        # Winnings land after the result event; clients refresh balances here
+        self._publish(period["game_type"], "settled", period)
+
+    async def run_settlement_sweep(self, interval=SETTLE_SWEEP_INTERVAL):
+
+        # Periods left settled: False by a failed settlement are picked up
+        # here rather than waiting for the next scheduler start
+        while True:
+            await asyncio.sleep(interval)
+            for game_type in GAME_DURATIONS:
+                try:
+                    await self.resume_settlements(game_type, min_age=SETTLE_SWEEP_GRACE)
+                except Exception:
+                    logger.exception("Settlement sweep for %s failed", game_type)
+
+    async def run_scheduler(self):
+
+        if self.lease and self.schedule == SCHEDULE_STORED:
+            # Fence off the scheduled periods from any previous leader that
+            # still thinks it holds the lease
+            await self.db.wingo_periods.update_many(
+                {"revealed": False}, {"$max": {"fence": self.lease.token}}
+            )
+
+        # Each mode is prepared and rescheduled independently: a failing step
+        # is retried after a pause without stopping the other modes. A heap
+        # entry without a period means "schedule the next one".
+        heap = [(time.monotonic(), game_type, None) for game_type in GAME_DURATIONS]
+        prepared = set()
+
+        while True:
+            deadline, game_type, period = heap[0]
+
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
                 continue
 
-            sleep_time = (next_period["end_time"] - datetime.utcnow()).total_seconds()
+            heapq.heappop(heap)
+
+            try:
+                if period is not None:
+                    await self.reveal_period(period)
+                    period = None
+                elif game_type not in prepared:
+                    await self._prepare(game_type)
+                    prepared.add(game_type)
+
+                heapq.heappush(heap, await self._next_deadline(game_type))
+            except LeaseLost as exc:
+                # The lease heartbeat notices the stopped scheduler and
+                # hands leadership on
+                logger.warning("Stopping the scheduler: %s", exc)
+                return
+            except Exception:
+                logger.exception(
+                    "Scheduler step for %s %s failed, retrying in %ss",
+                    game_type, period["period_id"] if period else "", SCHEDULER_RETRY_DELAY
+                )
+                heapq.heappush(heap, (time.monotonic() + SCHEDULER_RETRY_DELAY, game_type, period))
+
+    async def _prepare(self, game_type):
+
+        await self.resume_settlements(game_type)
+        await self.catch_up(game_type)
+        await self.warm_history(game_type)
+        if self.result_stats:
+            await self.result_stats.warm(game_type)
+
+    # -----------------------------
+    # FOLLOWER (NON-LEADER WORKERS)
+    # -----------------------------
+    async def _current_period(self, game_type):
 
-            if sleep_time > 0:
-                await asyncio.sleep(sleep_time)
+        if self.schedule == SCHEDULE_DERIVED:
+            return self.period_at(game_type, datetime.utcnow())
 
-            await self.db.wingo_periods.update_one(
-                {"_id": next_period["_id"]},
-                {"$set": {"revealed": True}}
+        return await self.db.wingo_periods.find_one(
+            {"game_type": game_type, "revealed": False},
+            sort=[("start_time", 1)]
+        )
+
+    async def follow(self, interval=FOLLOW_INTERVAL):
+
+        # Workers without the lease mirror the leader's reveals from the
+        # database so history, stats, push events and the betting window
+        # stay live on every worker
+        last_seen = {}
+        for game_type in GAME_DURATIONS:
+            await self.warm_history(game_type)
+            if self.result_stats:
+                await self.result_stats.warm(game_type)
+
+            last = await self.db.wingo_periods.find_one(
+                {"game_type": game_type, "revealed": True},
+                sort=[("start_time", -1)],
+                projection={"end_time": 1}
             )
+            last_seen[game_type] = last["end_time"] if last else datetime.utcnow()
 
-            await self.settle_bets(next_period)
+        while True:
+            for game_type in GAME_DURATIONS:
+                try:
+                    revealed = await self.db.wingo_periods.find(
+                        {"game_type": game_type, "revealed": True, "end_time": {"$gt": last_seen[game_type]}}
+                    ).sort("end_time", 1).limit(FOLLOW_BATCH).to_list(FOLLOW_BATCH)
+
+                    for period in revealed:
+                        self._announce(period)
+                        last_seen[game_type] = period["end_time"]
+
+                    current = self.current.get(game_type)
+                    if not current or current["end_time"] <= datetime.utcnow():
+                        period = await self._current_period(game_type)
+                        if period and (not current or period["period_id"] != current["period_id"]):
+                            self.current[game_type] = period
+                            self._publish(game_type, "open", period)
+                except Exception:
+                    logger.exception("Following %s reveals failed", game_type)
+
+            await asyncio.sleep(interval)
+
+    async def drain(self, timeout):
+
+        # Let in-flight settlements finish before shutting down
+        if self._settlements:
+            await asyncio.wait(list(self._settlements), timeout=timeout)
+
+    def engine_status(self):
+        return {
+            "schedule": self.schedule,
+            "leader": self.lease.is_leader if self.lease else True,
+            "reveal_lag": dict(self.reveal_lag),
+            "pending_settlements": len(self._settlements),
+        }
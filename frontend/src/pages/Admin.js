@@ -21,6 +21,7 @@ const Admin = () => {
   const [deposits, setDeposits] = useState([]);
   const [withdrawals, setWithdrawals] = useState([]);
   const [users, setUsers] = useState([]);
+  const [usersCursor, setUsersCursor] = useState(null);
   const [dashboardStats, setDashboardStats] = useState({});
   const [searchQuery, setSearchQuery] = useState('');
   const [searchResults, setSearchResults] = useState([]);
@@ -57,7 +58,8 @@ const Admin = () => {
       }
       if (activeTab === 'users') {
         const res = await axios.get(`${API}/admin/users`, authConfig);
-        setUsers(res.data);
+        setUsers(res.data.items);
+        setUsersCursor(res.data.next_cursor);
       }
     } catch (err) {
       console.error(err);
@@ -67,6 +69,20 @@ const Admin = () => {
     }
   };
 
+  const loadMoreUsers = async () => {
+    try {
+      const res = await axios.get(`${API}/admin/users`, {
+        ...authConfig,
+        params: { cursor: usersCursor },
+      });
+      setUsers(prev => [...prev, ...res.data.items]);
+      setUsersCursor(res.data.next_cursor);
+    } catch (err) {
+      console.error(err);
+      toast.error("Failed to load users");
+    }
+  };
+
   const handleDepositAction = async (id, action) => {
     try {
       await axios.put(`${API}/admin/deposit/${id}/${action}`, {}, authConfig);
@@ -172,6 +188,9 @@ const Admin = () => {
                 {u.name} - ₹{u.balance}
               </div>
             ))}
+            {usersCursor && (
+              <button onClick={loadMoreUsers}>Load more</button>
+            )}
           </div>
         )}
 
@@ -22,7 +22,6 @@ const Game = () => {
   const [recentResults, setRecentResults] = useState([]);
   const [gameHistory, setGameHistory] = useState([]);
   const [betting, setBetting] = useState(false);
-  const [gameResult, setGameResult] = useState(null);
   const [showHistory, setShowHistory] = useState(false);
 
   const gameDuration = {
@@ -33,26 +32,48 @@ const Game = () => {
   }[mode];
 
   useEffect(() => {
+    let periodEnd = null;
+    let clockOffset = 0;
+
+    const source = new EventSource(`${API}/game/stream/${mode}`);
+    source.onmessage = (e) => {
+      const event = JSON.parse(e.data);
+      clockOffset = event.server_ts - Date.now();
+      if (event.type === 'open') {
+        periodEnd = event.end_ts;
+        setCurrentPeriod(event.period_id);
+      }
+      if (event.type === 'result') {
+        fetchGameHistory();
+        refreshBalance();
+      }
+      if (event.type === 'settled') {
+        // Winnings are credited after the result is announced
+        refreshBalance();
+      }
+    };
+
     const interval = setInterval(() => {
-      const now = Date.now();
+      const now = Date.now() + clockOffset;
+      if (periodEnd !== null) {
+        setCountdown(Math.max(0, Math.ceil((periodEnd - now) / 1000)));
+        return;
+      }
+      // Until the first server event arrives, estimate from the local clock
       const timeInCycle = Math.floor(now / 1000) % gameDuration;
       setCountdown(gameDuration - timeInCycle);
-      
-      // Generate period number based on timestamp
-      const periodBase = Math.floor(now / 1000 / gameDuration);
-      const year = new Date().getFullYear();
-      const month = String(new Date().getMonth() + 1).padStart(2, '0');
-      const day = String(new Date().getDate()).padStart(2, '0');
-      setCurrentPeriod(`${year}${month}${day}${String(periodBase).padStart(7, '0')}`);
     }, 100);
 
     fetchGameHistory();
-    return () => clearInterval(interval);
-  }, [gameDuration]);
+    return () => {
+      clearInterval(interval);
+      source.close();
+    };
+  }, [gameDuration, mode]);
 
   const fetchGameHistory = async () => {
     try {
-      const response = await axios.get(`${API}/game/history`);
+      const response = await axios.get(`${API}/game/history`, { params: { mode } });
       setGameHistory(response.data.slice(0, 50));
       // Create recent results from history
       const recent = response.data.slice(0, 10).map(g => ({
@@ -92,17 +113,8 @@ const Game = () => {
         bet_amount: finalAmount
       });
 
-      setGameResult(response.data);
       await refreshBalance();
-      await fetchGameHistory();
-
-      if (response.data.win_amount > 0) {
-        toast.success(`You won ₹${response.data.win_amount.toFixed(2)}!`);
-      } else {
-        toast.error('Better luck next time!');
-      }
-
-      setTimeout(() => setGameResult(null), 5000);
+      toast.success(`Bet placed for period ${response.data.period_id}`);
     } catch (error) {
       toast.error(error.response?.data?.detail || 'Bet failed');
     } finally {
@@ -253,42 +265,6 @@ const Game = () => {
           </div>
         )}
 
-        {/* Game Result Modal */}
-        {gameResult && (
-          <div 
-            data-testid="game-result-modal"
-            className="glass-panel p-6 mb-4 text-center border-2"
-            style={{ borderColor: gameResult.win_amount > 0 ? '#00FF94' : '#FF0055' }}
-          >
-            <div className="text-2xl font-bold mb-4" style={{ fontFamily: 'Unbounded' }}>
-              {gameResult.win_amount > 0 ? (
-                <span className="neon-green">YOU WON!</span>
-              ) : (
-                <span className="neon-pink">TRY AGAIN!</span>
-              )}
-            </div>
-            <div className="flex items-center justify-center gap-6 mb-4">
-              <div>
-                <div className="text-xs" style={{ color: '#A1A1AA' }}>Result</div>
-                <div 
-                  className="text-5xl font-bold mono"
-                  style={{ color: gameResult.win_amount > 0 ? '#00FF94' : '#FF0055' }}
-                >
-                  {gameResult.result_number}
-                </div>
-                <div className="text-sm mt-1 capitalize">
-                  {gameResult.result_color.replace('-', ' + ')}
-                </div>
-              </div>
-            </div>
-            {gameResult.win_amount > 0 && (
-              <div className="text-2xl mono neon-green">
-                Won: ₹{gameResult.win_amount.toFixed(2)}
-              </div>
-            )}
-          </div>
-        )}
-
         {/* Betting Section */}
         <div className="glass-panel p-4 mb-4">
           {/* Multiplier Buttons */}
@@ -369,7 +345,9 @@ const Game = () => {
                 }}
               >
                 <div>{color}</div>
-                <div className="text-xs mt-1">{color === 'violet' ? '4.5x' : '2x'}</div>
+                <div className="text-xs mt-1">
+                  {color === 'violet' ? '4.5x' : `2x · ${color === 'green' ? '5' : '0'}: 1.5x`}
+                </div>
               </button>
             ))}
           </div>
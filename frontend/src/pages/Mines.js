@@ -57,6 +57,11 @@ export default function Mines() {
       setGrid(newGrid);
       setMultiplier(res.data.multiplier);
 
+      if (res.data.status === "cashed_out") {
+        toast.success(`🏆 Board cleared! ₹${res.data.payout}`);
+        setGame(null);
+      }
+
     } catch {
       toast.error("Reveal failed");
     }
@@ -0,0 +1,295 @@
+"""Async load-test harness for the Wingo backend.
+
+Drives the ASGI app in-process (default) or a server on localhost with
+httpx + asyncio concurrency, and reports latency percentiles and throughput
+per scenario.
+
+    python loadtest.py                                   # in-process, in-memory DB
+    python loadtest.py --mongo-url mongodb://localhost:27017
+    python loadtest.py --base-url http://localhost:8001 --mongo-url mongodb://localhost:27017
+
+Test users are seeded directly in the database, so a --base-url run needs
+--mongo-url pointing at the same database as the server. The in-memory
+stand-in (mongomock-motor) is only usable in-process.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+PASSWORD = "LoadTest123!"
+SCENARIOS = ["login_burst", "bet_storm", "mines_clicks"]
+
+
+class Results:
+
+    def __init__(self, name):
+        self.name = name
+        self.latencies = []
+        self.errors = 0
+        self.statuses = {}
+        self.started = None
+        self.finished = None
+
+    def record(self, seconds, status):
+        self.latencies.append(seconds)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if status >= 400:
+            self.errors += 1
+
+    def percentile(self, p):
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))
+        return ordered[index] * 1000
+
+    def report(self):
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        count = len(self.latencies)
+        return {
+            "scenario": self.name,
+            "requests": count,
+            "errors": self.errors,
+            "statuses": self.statuses,
+            "elapsed_s": round(elapsed, 3),
+            "rps": round(count / elapsed, 1) if elapsed else 0,
+            "p50_ms": round(self.percentile(50), 2),
+            "p95_ms": round(self.percentile(95), 2),
+            "p99_ms": round(self.percentile(99), 2),
+        }
+
+
+async def timed(client, results, method, url, **kwargs):
+    started = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+        status = response.status_code
+    except httpx.HTTPError:
+        response, status = None, 599
+    results.record(time.perf_counter() - started, status)
+    return response
+
+
+async def bounded(concurrency, coros):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(coro):
+        async with semaphore:
+            return await coro
+
+    return await asyncio.gather(*(run(c) for c in coros))
+
+# -------------------------------
+# SETUP
+# -------------------------------
+
+async def seed_users(db, count, balance, hashed):
+    tag = uuid.uuid4().hex[:8]
+    users = [
+        {
+            "id": str(uuid.uuid4()),
+            "email": f"load-{tag}-{i}@example.com",
+            "name": f"Load {i}",
+            "password": hashed,
+            "balance": balance,
+            "vip_tier": 1,
+            "role": "user",
+            "created_at": datetime.now(timezone.utc),
+        }
+        for i in range(count)
+    ]
+    await db.users.insert_many([dict(u) for u in users])
+    return users
+
+
+def auth(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def login_all(client, users, concurrency):
+    results = Results("setup_login")
+    results.started = time.perf_counter()
+    responses = await bounded(concurrency, [
+        timed(client, results, "POST", "/api/auth/login", json={"email": u["email"], "password": PASSWORD})
+        for u in users
+    ])
+    return [r.json()["token"] for r in responses if r is not None and r.status_code == 200]
+
+# -------------------------------
+# SCENARIOS
+# -------------------------------
+
+async def login_burst(ctx):
+    results = Results("login_burst")
+    results.started = time.perf_counter()
+    await bounded(ctx.concurrency, [
+        timed(ctx.client, results, "POST", "/api/auth/login",
+              json={"email": u["email"], "password": PASSWORD})
+        for u in ctx.users
+    ])
+    results.finished = time.perf_counter()
+    return results
+
+
+async def seconds_to_close(ctx, mode):
+    if ctx.server is not None:
+        for _ in range(100):
+            period = ctx.server.wingo_engine.current.get(mode)
+            if period:
+                return (period["end_time"] - datetime.utcnow()).total_seconds()
+            await asyncio.sleep(0.1)
+        raise RuntimeError("Engine has no open period")
+
+    # Out of process: read the first event from the push stream
+    async with ctx.client.stream("GET", f"/api/game/stream/{mode}", timeout=None) as response:
+        async for line in response.aiter_lines():
+            if line.startswith("data: "):
+                event = json.loads(line[6:])
+                return (event["end_ts"] - event["server_ts"]) / 1000
+    raise RuntimeError("Push stream closed without an event")
+
+
+async def bet_storm(ctx):
+    mode = "30s"
+    remaining = await seconds_to_close(ctx, mode)
+
+    # Aim for the last five seconds of the period (bets close 2s before end)
+    wait = remaining - 5
+    if wait < 0:
+        wait += 30
+    print(f"bet_storm: waiting {wait:.1f}s for the closing window", file=sys.stderr)
+    await asyncio.sleep(wait)
+
+    results = Results("bet_storm")
+    results.started = time.perf_counter()
+    bet = {"game_mode": mode, "bet_type": "color", "bet_value": "green", "bet_amount": 10}
+    await bounded(ctx.concurrency, [
+        timed(ctx.client, results, "POST", "/api/game/bet", json=bet, headers=auth(token))
+        for _ in range(ctx.bets_per_user)
+        for token in ctx.tokens
+    ])
+    results.finished = time.perf_counter()
+    return results
+
+
+async def mines_clicks(ctx):
+    results = Results("mines_clicks")
+    results.started = time.perf_counter()
+
+    async def play(token):
+        client = ctx.client
+        game = await timed(client, results, "POST", "/api/mines/start",
+                           json={"bet_amount": 10, "mines": 3}, headers=auth(token))
+        if game is None or game.status_code != 200:
+            return
+
+        game_id = game.json()["game_id"]
+        for cell in range(ctx.clicks_per_game):
+            response = await timed(client, results, "POST", "/api/mines/reveal",
+                                   json={"game_id": game_id, "cell_index": cell}, headers=auth(token))
+            if response is None or response.status_code != 200 or response.json().get("result") == "mine":
+                return
+
+        await timed(client, results, "POST", "/api/mines/cashout",
+                    json={"game_id": game_id}, headers=auth(token))
+
+    await bounded(ctx.concurrency, [play(token) for token in ctx.tokens])
+    results.finished = time.perf_counter()
+    return results
+
+
+# -------------------------------
+# RUNNER
+# -------------------------------
+
+class Context:
+    pass
+
+
+async def main(args):
+    os.environ.setdefault("DB_NAME", args.db_name)
+    os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+
+    if args.mongo_url:
+        os.environ["MONGO_URL"] = args.mongo_url
+        from motor.motor_asyncio import AsyncIOMotorClient
+        db_client = AsyncIOMotorClient(args.mongo_url)
+    else:
+        if args.base_url:
+            sys.exit("--base-url needs --mongo-url to seed users")
+        # In-memory stand-in, swapped in before server.py creates its client
+        import motor.motor_asyncio
+        from mongomock_motor import AsyncMongoMockClient
+        motor.motor_asyncio.AsyncIOMotorClient = AsyncMongoMockClient
+        os.environ["MONGO_URL"] = "mongodb://in-memory"
+        db_client = None
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    ctx = Context()
+    ctx.concurrency = args.concurrency
+    ctx.bets_per_user = args.bets_per_user
+    ctx.clicks_per_game = args.clicks_per_game
+    ctx.server = None
+
+    if args.base_url:
+        ctx.client = httpx.AsyncClient(base_url=args.base_url, timeout=30)
+        db = db_client[os.environ["DB_NAME"]]
+    else:
+        import server
+        ctx.server = server
+        db = server.db if db_client is None else db_client[os.environ["DB_NAME"]]
+        await server.app.router.startup()
+        ctx.client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=server.app), base_url="http://loadtest", timeout=30
+        )
+
+    from passwords import PasswordHasher
+    hashed = await PasswordHasher(rounds=args.bcrypt_rounds).hash(PASSWORD)
+    ctx.users = await seed_users(db, args.users, args.balance, hashed)
+    ctx.tokens = await login_all(ctx.client, ctx.users, args.concurrency)
+    if not ctx.tokens:
+        sys.exit("No test user could log in")
+
+    scenarios = SCENARIOS if args.scenario == "all" else [args.scenario]
+    reports = []
+    try:
+        for name in scenarios:
+            results = await globals()[name](ctx)
+            reports.append(results.report())
+            print(json.dumps(reports[-1]), file=sys.stderr)
+    finally:
+        await ctx.client.aclose()
+        await db.users.delete_many({"id": {"$in": [u["id"] for u in ctx.users]}})
+        if ctx.server is not None:
+            await ctx.server.app.router.shutdown()
+
+    print(json.dumps(reports, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Wingo backend load test")
+    parser.add_argument("--scenario", choices=SCENARIOS + ["all"], default="all")
+    parser.add_argument("--base-url", help="target a running server instead of the in-process app")
+    parser.add_argument("--mongo-url", help="local mongod; defaults to an in-memory stand-in")
+    parser.add_argument("--db-name", default="wingo_loadtest")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--balance", type=float, default=10_000)
+    parser.add_argument("--bets-per-user", type=int, default=5)
+    parser.add_argument("--clicks-per-game", type=int, default=10)
+    parser.add_argument("--bcrypt-rounds", type=int, default=int(os.environ.get("BCRYPT_ROUNDS", "12")))
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,46 @@
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+from db_indexes import ensure_indexes  # noqa: E402
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture
+def db():
+    # In-memory stand-in for MongoDB with the production indexes, so unique
+    # keys behave as they do in the real collections
+    database = AsyncMongoMockClient()["wingo_test"]
+    run(ensure_indexes(database))
+    return database
+
+
+@pytest.fixture(scope="session")
+def server():
+    # server.py builds its Motor client at import time; swap in the
+    # in-memory client for the import only
+    import motor.motor_asyncio
+
+    os.environ.setdefault("MONGO_URL", "mongodb://in-memory")
+    os.environ.setdefault("DB_NAME", "wingo_test")
+    os.environ.setdefault("JWT_SECRET", "test-secret-with-at-least-32-bytes!")
+
+    original = motor.motor_asyncio.AsyncIOMotorClient
+    motor.motor_asyncio.AsyncIOMotorClient = AsyncMongoMockClient
+    try:
+        import server as module
+    finally:
+        motor.motor_asyncio.AsyncIOMotorClient = original
+
+    run(ensure_indexes(module.db))
+    return module
@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+
+import bet_ingest
+from bet_ingest import BetIngestor
+from tests.conftest import run
+
+
+class UnreachableCollection:
+
+    async def insert_many(self, *args, **kwargs):
+        raise ConnectionError("database unreachable")
+
+    def find(self, *args, **kwargs):
+        raise ConnectionError("database unreachable")
+
+    async def update_one(self, *args, **kwargs):
+        raise ConnectionError("database unreachable")
+
+    async def bulk_write(self, *args, **kwargs):
+        raise ConnectionError("database unreachable")
+
+
+class UnreachableDB:
+
+    def __getattr__(self, name):
+        return UnreachableCollection()
+
+
+def bet(bet_id, user_id="player", amount=10, period_id="20240101000000"):
+    return {
+        "id": bet_id, "user_id": user_id, "game_type": "30s", "period_id": period_id,
+        "amount": amount, "status": "pending",
+    }
+
+
+def test_flush_resolves_every_bet_in_one_batch(db):
+
+    async def scenario():
+        ingestor = BetIngestor(db, max_delay=0.01)
+        ingestor.start()
+
+        results = await asyncio.gather(*(ingestor.submit(bet(f"b{i}")) for i in range(3)))
+
+        assert [r["id"] for r in results] == ["b0", "b1", "b2"]
+        assert ingestor.flushes == 1
+        assert await db.bets.count_documents({}) == 3
+        await ingestor.close()
+
+    run(scenario())
+
+
+def test_outage_fails_requests_without_killing_the_flusher(monkeypatch):
+    monkeypatch.setattr(bet_ingest, "VERIFY_BACKOFF", 0)
+
+    async def scenario():
+        ingestor = BetIngestor(UnreachableDB(), max_delay=0.01)
+        ingestor.start()
+
+        for bet_id in ("first", "second"):
+            with pytest.raises(ConnectionError):
+                await asyncio.wait_for(ingestor.submit(bet(bet_id)), 1)
+
+        assert not ingestor._task.done()
+        await ingestor.close()
+
+    run(scenario())
+
+
+def test_partial_insert_refunds_only_missing_bets(db, monkeypatch):
+    collection = type(db.bets)
+    insert_many = collection.insert_many
+
+    async def insert_first_then_time_out(self, documents, **kwargs):
+        await insert_many(self, documents[:1])
+        raise TimeoutError("write timed out")
+
+    monkeypatch.setattr(collection, "insert_many", insert_first_then_time_out)
+
+    async def scenario():
+        # place_bet has already debited 3 x 10
+        await db.users.insert_one({"id": "player", "email": "player@example.com", "balance": 70})
+
+        ingestor = BetIngestor(db, max_delay=0.01)
+        ingestor.start()
+        results = await asyncio.gather(
+            *(ingestor.submit(bet(f"b{i}")) for i in range(3)), return_exceptions=True
+        )
+
+        assert results[0]["id"] == "b0"
+        assert all(isinstance(r, TimeoutError) for r in results[1:])
+        assert (await db.users.find_one({"id": "player"}))["balance"] == 90
+        await ingestor.close()
+
+    run(scenario())
+
+
+def test_bets_reaching_a_revealed_period_are_refunded_not_written(db):
+
+    async def scenario():
+        # place_bet has already debited 2 x 10
+        await db.users.insert_one({"id": "player", "email": "player@example.com", "balance": 80})
+        await db.wingo_periods.insert_one(
+            {"game_type": "30s", "period_id": "closed", "revealed": True, "settled": True}
+        )
+
+        ingestor = BetIngestor(db, max_delay=0.01)
+        ingestor.start()
+        late, on_time = await asyncio.gather(
+            ingestor.submit(bet("late", period_id="closed")),
+            ingestor.submit(bet("on-time")),
+            return_exceptions=True,
+        )
+
+        assert isinstance(late, bet_ingest.PeriodClosed)
+        assert on_time["id"] == "on-time"
+        assert await db.bets.count_documents({}) == 1
+        assert (await db.users.find_one({"id": "player"}))["balance"] == 90
+        await ingestor.close()
+
+    run(scenario())
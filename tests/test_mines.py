@@ -0,0 +1,86 @@
+import uuid
+
+import httpx
+
+from tests.conftest import run
+
+TOTAL_CELLS = 25
+
+
+async def player(server, balance=100):
+    user_id = str(uuid.uuid4())
+    email = f"{user_id}@example.com"
+    await server.db.users.insert_one({
+        "id": user_id, "email": email, "name": "Player", "role": "user",
+        "balance": balance, "vip_tier": 1,
+    })
+    return user_id, {"Authorization": f"Bearer {server.create_token(user_id, email, 'user')}"}
+
+
+async def start_game(server, client, headers, mines, bet_amount=10):
+    response = await client.post(
+        "/api/mines/start", json={"bet_amount": bet_amount, "mines": mines}, headers=headers
+    )
+    assert response.status_code == 200
+    game_id = response.json()["game_id"]
+    stored = await server.db.mines_games.find_one({"game_id": game_id})
+    safe = [c for c in range(TOTAL_CELLS) if c not in stored["mine_positions"]]
+    return game_id, safe
+
+
+def client_for(server):
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://test")
+
+
+def test_reveal_batch_clearing_the_board_cashes_out(server):
+
+    async def scenario():
+        user_id, headers = await player(server)
+        async with client_for(server) as client:
+            game_id, safe = await start_game(server, client, headers, mines=20)
+
+            response = await client.post(
+                "/api/mines/reveal-batch", json={"game_id": game_id, "cells": safe}, headers=headers
+            )
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["status"] == "cashed_out"
+        assert body["payout"] == round(10 * server.mines_multiplier(20, len(safe)), 2)
+        user = await server.db.users.find_one({"id": user_id})
+        assert user["balance"] == 90 + body["payout"]
+
+    run(scenario())
+
+
+def test_reveal_of_the_only_safe_cell_cashes_out(server):
+
+    async def scenario():
+        _, headers = await player(server)
+        async with client_for(server) as client:
+            game_id, safe = await start_game(server, client, headers, mines=24)
+
+            response = await client.post(
+                "/api/mines/reveal", json={"game_id": game_id, "cell_index": safe[0]}, headers=headers
+            )
+            assert response.status_code == 200
+            body = response.json()
+            assert body["status"] == "cashed_out"
+            # One safe cell in 25 must pay well above the stake
+            assert body["payout"] > 10
+
+            again = await client.post(
+                "/api/mines/cashout", json={"game_id": game_id}, headers=headers
+            )
+            assert again.status_code == 404
+
+    run(scenario())
+
+
+def test_multiplier_rises_up_to_a_cleared_board(server):
+    for mines in (1, 3, 24):
+        safe_cells = TOTAL_CELLS - mines
+        steps = [server.mines_multiplier(mines, k) for k in range(1, safe_cells + 1)]
+        assert steps == sorted(steps)
+        assert len(set(steps)) == len(steps)
+        assert steps[-1] > 1
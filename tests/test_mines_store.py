@@ -0,0 +1,25 @@
+from mines_store import MinesStore
+from tests.conftest import run
+
+
+def test_stale_worker_cannot_reveal_a_cell_twice(db):
+
+    async def scenario():
+        first, second = MinesStore(db), MinesStore(db)
+        await first.create({
+            "game_id": "game", "user_id": "player", "bet_amount": 10, "mines": 3,
+            "mine_positions": [22, 23, 24], "revealed": [], "multiplier": 1.0, "status": "active",
+        })
+
+        ours = await first.get("game", "player")
+        stale = await second.get("game", "player")
+
+        assert await first.update(ours, revealed=[0], multiplier=1.1)
+        assert not await second.update(stale, revealed=[0], multiplier=1.1)
+
+        fresh = await second.get("game", "player", fresh=True)
+        assert fresh["revealed"] == [0]
+        assert not await first.finish(stale, "cashed_out", payout=11)
+        assert await second.finish(fresh, "cashed_out", payout=11)
+
+    run(scenario())
@@ -0,0 +1,27 @@
+import pytest
+
+from tests.conftest import run
+from tests.test_settlement import add_bet, add_user, balance, make_engine, revealed_period
+
+
+def test_referred_bets_accrue_commission_off_settlement(db):
+    engine = make_engine(db)
+
+    async def scenario():
+        period = await revealed_period(db, engine, 2)
+        await add_user(db, "referrer")
+        await add_user(db, "player", referrer_id="referrer")
+        await add_bet(db, period, "player", "color", "green", amount=100)
+
+        await engine.settle_bets(period)
+        assert await db.referral_ledger.count_documents({}) == 0
+        assert await db.bets.count_documents({"commission": "pending"}) == 1
+
+        assert await engine.referrals.accrue_pending() == 1
+        assert await engine.referrals.accrue_pending() == 0
+
+        payout = await engine.referrals.payout()
+        assert payout == {"referrers": 1, "entries": 1}
+        assert await balance(db, "referrer") == pytest.approx(2)
+
+    run(scenario())
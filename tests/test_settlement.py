@@ -0,0 +1,145 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import wingo_engine
+from wingo_engine import SCHEDULE_DERIVED, WingoEngine
+from tests.conftest import run
+
+
+def make_engine(db):
+    return WingoEngine(db, schedule=SCHEDULE_DERIVED, seed="test-seed")
+
+
+async def revealed_period(db, engine, number):
+    period = engine.period_at("30s", datetime.utcnow() - timedelta(minutes=5))
+    period.update(
+        result_number=number,
+        result_color=engine.color_for_number(number),
+        revealed=True,
+        settled=False,
+    )
+    await db.wingo_periods.insert_one(dict(period))
+    return period
+
+
+async def add_user(db, user_id, **fields):
+    await db.users.insert_one({
+        "id": user_id, "email": f"{user_id}@example.com", "balance": 0, "vip_tier": 1, **fields
+    })
+
+
+async def add_bet(db, period, user_id, bet_type, bet_value, amount=10):
+    await db.bets.insert_one({
+        "id": f"{user_id}-{bet_type}-{bet_value}",
+        "user_id": user_id,
+        "game_type": period["game_type"],
+        "period_id": period["period_id"],
+        "bet_type": bet_type,
+        "bet_value": bet_value,
+        "amount": amount,
+        "status": "pending",
+    })
+
+
+async def balance(db, user_id):
+    return (await db.users.find_one({"id": user_id}))["balance"]
+
+
+@pytest.mark.parametrize("bet_type, value, result, vip, expected", [
+    ("number", "7", 7, 1, 9),
+    ("number", "7", 7, 4, 10.5),
+    ("number", "7", 3, 1, 0),
+    ("color", "green", 3, 1, 2),
+    ("color", "red", 2, 1, 2),
+    ("color", "red", 3, 1, 0),
+    ("color", "red", 0, 1, 1.5),
+    ("color", "green", 5, 1, 1.5),
+    ("color", "green", 0, 1, 0),
+    ("color", "violet", 0, 1, 4.5),
+    ("color", "violet", 5, 1, 4.5),
+    ("color", "violet", 4, 1, 0),
+    ("bigsmall", "big", 5, 1, 2),
+    ("bigsmall", "small", 4, 1, 2),
+    ("bigsmall", "big", 4, 1, 0),
+])
+def test_bet_multiplier(db, bet_type, value, result, vip, expected):
+    engine = make_engine(db)
+    bet = {"bet_type": bet_type, "bet_value": value}
+    assert engine.bet_multiplier(bet, result, vip) == expected
+
+
+def test_settle_bets_credits_winners_and_marks_bets(db):
+    engine = make_engine(db)
+
+    async def scenario():
+        period = await revealed_period(db, engine, 3)
+        await add_user(db, "winner")
+        await add_user(db, "loser")
+        await add_bet(db, period, "winner", "number", "3")
+        await add_bet(db, period, "winner", "color", "green")
+        await add_bet(db, period, "loser", "color", "red")
+
+        result = await engine.settle_bets(period)
+
+        assert result["bets"] == 3
+        assert await balance(db, "winner") == 90 + 20
+        assert await balance(db, "loser") == 0
+        assert await db.bets.count_documents({"status": "settled"}) == 3
+        assert await db.bets.count_documents({"status": "settled", "win": False}) == 1
+        stored = await db.wingo_periods.find_one({"period_id": period["period_id"]})
+        assert stored["settled"] is True
+
+    run(scenario())
+
+
+def test_resettling_after_crash_does_not_double_credit(db, monkeypatch):
+    monkeypatch.setattr(wingo_engine, "SHARD_MIN_BETS", 1)
+    engine = make_engine(db)
+    users = [f"user-{i}" for i in range(20)]
+
+    async def scenario():
+        period = await revealed_period(db, engine, 8)
+        for user_id in users:
+            await add_user(db, user_id)
+            await add_bet(db, period, user_id, "number", "8")
+
+        result = await engine.settle_bets(period)
+        assert result["shards"] == wingo_engine.SETTLE_SHARDS
+
+        # Crash after the users were credited but before the bet statuses
+        # and shard checkpoints were written
+        await db.bets.update_many({}, {"$set": {"status": "pending"}})
+        await db.wingo_periods.update_one(
+            {"period_id": period["period_id"]},
+            {"$set": {"settled": False}, "$unset": {"settled_shards": ""}}
+        )
+
+        assert await engine.resume_settlements("30s") == 1
+
+        for user_id in users:
+            assert await balance(db, user_id) == 90
+        assert await db.bets.count_documents({"status": "pending"}) == 0
+        totals = await db.stats.find_one({"_id": "totals"})
+        assert totals["total_active_balance"] == 90 * len(users)
+        stored = await db.wingo_periods.find_one({"period_id": period["period_id"]})
+        assert stored["settled"] is True
+
+    run(scenario())
+
+
+def test_failed_settlement_is_picked_up_by_resume(db):
+    engine = make_engine(db)
+
+    async def scenario():
+        period = await revealed_period(db, engine, 1)
+        await add_user(db, "player")
+        await add_bet(db, period, "player", "color", "green")
+
+        # Recent periods are left to their in-flight settlement task
+        assert await engine.resume_settlements("30s", min_age=timedelta(hours=1)) == 0
+        assert await engine.resume_settlements("30s") == 1
+        assert await balance(db, "player") == 20
+
+    run(scenario())
+